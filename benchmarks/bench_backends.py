@@ -0,0 +1,48 @@
+"""
+Compares the html and efetch backends on the local fixture server.
+
+Scrapes the same URLs with each backend and reports wall time and the
+number of HTTP requests the server saw. Run from the repository root:
+
+    python benchmarks/bench_backends.py --count 2000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixture_server import fixture_urls, request_counts, start_fixture_server  # noqa: E402
+from scrape_pubmed import Scraper  # noqa: E402
+
+
+async def run(count, max_requests, latency):
+    runner, base_url = await start_fixture_server(latency=latency)
+    urls = fixture_urls(base_url, count)
+    try:
+        for backend in ("html", "efetch"):
+            before = request_counts(runner)
+            scraper = Scraper(None, delay=0, max_requests=max_requests, backend=backend,
+                              eutils_url=f"{base_url}/entrez/eutils", pubmed_url=base_url)
+            start = time.perf_counter()
+            async with scraper:
+                scraped = [data async for _, _, data in scraper.scrape_iter(urls) if data]
+            elapsed = time.perf_counter() - start
+            after = request_counts(runner)
+            requests = sum(after.values()) - sum(before.values())
+            print(f"{backend:<8} {elapsed:8.3f} s  {count / elapsed:10.1f} pages/s  "
+                  f"{requests:6d} requests  {len(scraped):6d} articles")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compares the html and efetch backends on a local fixture server.')
+    parser.add_argument('--count', type=int, default=1000, help='Number of URLs to scrape. Default is 1000.')
+    parser.add_argument('--max_requests', type=int, default=5, help='Maximum number of concurrent requests. Default is 5.')
+    parser.add_argument('--latency', type=float, default=0.05, help='Artificial server latency in seconds. Default is 0.05.')
+    args = parser.parse_args()
+    asyncio.run(run(args.count, args.max_requests, args.latency))
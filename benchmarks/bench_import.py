@@ -0,0 +1,97 @@
+"""
+Import-time budget check for scrape_pubmed.
+
+Runs `python -X importtime -c "import scrape_pubmed"` in a fresh process
+and fails if importing the module takes longer than --budget
+milliseconds or pulls in any of the heavy dependencies that are meant
+to be imported lazily (pandas, bs4, aiohttp, ...). It also reports the
+slowest imports and the wall time of `scrape_pubmed.py --help`. Exits
+with status 1 when over budget; tests/test_import_time.py runs the
+same checks under pytest. Run from the repository root:
+
+    python benchmarks/bench_import.py --budget 300
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAZY_MODULES = ("pandas", "numpy", "bs4", "soupsieve", "lxml", "selectolax", "aiohttp",
+                "pyarrow", "tqdm", "uvloop", "multiprocessing")
+
+# The import takes about 100 ms on a small CI machine, bytecode compilation
+# included, and up to about 140 ms on a noisy one. Importing aiohttp alone
+# adds about 250 ms and pandas about 450 ms, so 300 ms leaves room for slow
+# runners while a heavy import at module load still goes over; LAZY_MODULES
+# catches those regardless of timing.
+BUDGET_MS = 300
+
+
+def import_times(module="scrape_pubmed"):
+    """Returns [(name, self_us, cumulative_us)] from -X importtime for importing module in a fresh process."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT_DIR,
+                            capture_output=True, text=True, check=True)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times.append((name[1:].rstrip(), int(self_us), int(cumulative_us)))
+    return times
+
+
+def help_time(repeat):
+    """Returns the best wall time of `scrape_pubmed.py --help` in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(ROOT_DIR, "scrape_pubmed.py"), "--help"],
+                       capture_output=True, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(repeat):
+    """Returns (best import time of scrape_pubmed in ms, that run's import times, LAZY_MODULES imported eagerly)."""
+    # The first run may compile scrape_pubmed.py to bytecode; time the warm ones.
+    import_times()
+    runs = [import_times() for _ in range(repeat)]
+    totals = [next(cumulative for name, _, cumulative in times if name.strip() == "scrape_pubmed") for times in runs]
+    best = min(range(repeat), key=lambda i: totals[i])
+    times = runs[best]
+    loaded = {name.strip().split(".")[0] for name, _, _ in times}
+    return totals[best] / 1000, times, [module for module in LAZY_MODULES if module in loaded]
+
+
+def run(budget, repeat, top):
+    total, times, eager = measure(repeat)
+
+    print(f"import scrape_pubmed: {total:.1f} ms (budget {budget:.0f} ms)")
+    print(f"scrape_pubmed.py --help: {help_time(repeat) * 1000:.1f} ms")
+    print("Slowest imports made by scrape_pubmed:")
+    top_level = [(name.strip(), cumulative) for name, _, cumulative in times
+                 if name.startswith("  ") and not name.startswith("   ")]
+    for name, cumulative in sorted(top_level, key=lambda item: -item[1])[:top]:
+        print(f"  {name:<30} {cumulative / 1000:8.1f} ms")
+
+    failures = []
+    if total > budget:
+        failures.append(f"import took {total:.1f} ms, over the {budget:.0f} ms budget")
+    if eager:
+        failures.append(f"imported at module load: {', '.join(eager)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Checks the import time of scrape_pubmed against a budget.')
+    parser.add_argument('--budget', type=float, default=BUDGET_MS, help=f'Maximum import time in milliseconds. Default is {BUDGET_MS}.')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions; the best is reported. Default is 5.')
+    parser.add_argument('--top', type=int, default=10, help='Number of slowest imports listed. Default is 10.')
+    args = parser.parse_args()
+    sys.exit(run(args.budget, args.repeat, args.top))
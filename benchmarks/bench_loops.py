@@ -0,0 +1,71 @@
+"""
+Compares the default asyncio event loop with uvloop on the local fixture server.
+
+Runs the full scrape_pubmed.py command line with --loop asyncio and
+--loop uvloop at 50, 200 and 1000 concurrent requests, with no rate
+limit, using the same harness as bench_scraper.py. Pages are parsed
+with selectolax (or lxml) so that parsing does not cap the throughput
+before the event loop does. uvloop is skipped when it is not installed.
+Run from the repository root:
+
+    python benchmarks/bench_loops.py --count 5000
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_scraper import free_port, run_scraper, start_server  # noqa: E402
+from fixture_server import fixture_urls  # noqa: E402
+
+
+def fastest_parser():
+    """Returns the fastest parser engine that is installed."""
+    for engine, module in (("selectolax", "selectolax"), ("lxml", "lxml")):
+        if importlib.util.find_spec(module):
+            return engine
+    print("Neither selectolax nor lxml is installed; html.parser may limit throughput before the loop does")
+    return "html.parser"
+
+
+def run(count, concurrency, latency, jitter, parser_engine=None):
+    loops = ["asyncio"] + (["uvloop"] if importlib.util.find_spec("uvloop") else [])
+    if len(loops) == 1:
+        print("uvloop is not installed; timing the asyncio loop only")
+    parser_engine = parser_engine or fastest_parser()
+    port = free_port()
+    server = start_server(port, latency, jitter, 0.0, None)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            input_file = os.path.join(workdir, "urls.txt")
+            base_url = f"http://127.0.0.1:{port}"
+            with open(input_file, "w", encoding="utf-8") as f:
+                f.write("\n".join(fixture_urls(base_url, count)) + "\n")
+            print(f"Parsing with {parser_engine}")
+            print(f"{'loop':<8} {'max_requests':>12} {'pages/s':>9} {'fetch p50':>10} {'fetch p99':>10} {'cpu s':>7}")
+            for max_requests in concurrency:
+                for loop in loops:
+                    extra_args = ["--loop", loop, "--pubmed_url", base_url, "--parser", parser_engine]
+                    row = run_scraper(input_file, workdir, max_requests, 0, extra_args)
+                    print(f"{loop:<8} {max_requests:>12} {row['pages_per_sec']:>9.1f} "
+                          f"{row['fetch_p50'] * 1000:>7.1f} ms {row['fetch_p99'] * 1000:>7.1f} ms "
+                          f"{row['cpu_seconds']:>7.2f}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compares the asyncio and uvloop event loops on a local fixture server.')
+    parser.add_argument('--count', type=int, default=3000, help='Number of URLs scraped per run. Default is 3000.')
+    parser.add_argument('--max_requests', type=int, nargs='+', default=[50, 200, 1000], help='Concurrency limits to run. Default is 50 200 1000.')
+    parser.add_argument('--latency', type=float, default=0.05, help='Server latency in seconds. Default is 0.05.')
+    parser.add_argument('--jitter', type=float, default=0.02, help='Upper bound of random extra latency in seconds. Default is 0.02.')
+    parser.add_argument('--parser', type=str, default=None, choices=['html.parser', 'lxml', 'selectolax'],
+                        help='Parser engine of the scraper. Default is selectolax, or lxml when it is not installed.')
+    args = parser.parse_args()
+    run(args.count, args.max_requests, args.latency, args.jitter, args.parser)
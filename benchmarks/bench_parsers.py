@@ -0,0 +1,152 @@
+"""
+Microbenchmark for the HTML parser engines behind parse_html.
+
+Times parse_html over the saved article pages in fixtures/ with every
+installed engine, reporting per-page parse and select time for both
+the compiled EXTRACTION_PLAN and the previous approach of running all
+twelve ELEMENTS selectors over the whole document. It also checks that
+every engine and both approaches extract identical field values.
+
+It then breaks the cost down per field: each ELEMENTS selector is timed
+on its own over the already parsed pages, separately from reading the
+matched elements' text and from the _join_texts step, so selector and
+engine changes can be judged field by field. Everything runs offline.
+Run from the repository root:
+
+    python benchmarks/bench_parsers.py --copies 50
+    python benchmarks/bench_parsers.py --copies 20 --engines lxml selectolax
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import soupsieve  # noqa: E402
+from bs4 import BeautifulSoup  # noqa: E402
+
+from fixture_server import load_corpus  # noqa: E402
+from scrape_pubmed import ELEMENTS, PARSER_ENGINES, _join_texts, clean_text, extract_fields, parse_document  # noqa: E402
+
+
+def installed_engines():
+    """Returns the parser engines whose packages are importable."""
+    modules = {"html.parser": "bs4", "lxml": "lxml", "selectolax": "selectolax"}
+    return [engine for engine in PARSER_ENGINES if importlib.util.find_spec(modules[engine])]
+
+
+def extract_fields_per_selector(document):
+    """The previous extraction: every ELEMENTS selector run over the whole document."""
+    texts = {}
+    for key, value in ELEMENTS.items():
+        if isinstance(document.root, BeautifulSoup):
+            element = [e.text for e in document.root.select(value)]
+        else:
+            element = [node.text() for node in document.root.css(value)]
+        texts[key] = " ".join(clean_text(e) for e in element) if element else None
+    return texts
+
+
+EXTRACTORS = {"plan": extract_fields, "per-selector": extract_fields_per_selector}
+
+
+def check_identical(corpus, engines):
+    """Raises AssertionError if any engine or extractor disagrees with per-selector html.parser."""
+    for page in corpus:
+        expected = extract_fields_per_selector(parse_document(page, "html.parser"))
+        for engine in engines:
+            for name, extract in EXTRACTORS.items():
+                got = extract(parse_document(page, engine))
+                mismatched = [key for key in expected if str(got[key]) != str(expected[key])]
+                assert not mismatched, f"{engine} ({name}) differs from html.parser on {mismatched}"
+
+
+def time_engine(corpus, engine, extract, repeat):
+    """Returns the best (parse, select) seconds per page over `repeat` passes."""
+    best_parse = best_select = float("inf")
+    for _ in range(repeat):
+        parse_time = select_time = 0.0
+        for page in corpus:
+            start = time.perf_counter()
+            document = parse_document(page, engine)
+            parsed = time.perf_counter()
+            extract(document)
+            parse_time += parsed - start
+            select_time += time.perf_counter() - parsed
+        best_parse = min(best_parse, parse_time)
+        best_select = min(best_select, select_time)
+    return best_parse / len(corpus), best_select / len(corpus)
+
+
+def field_steps(engine):
+    """Returns (select, text) functions per field for an engine, with selectors compiled up front."""
+    steps = {}
+    for key, value in ELEMENTS.items():
+        if engine == "selectolax":
+            steps[key] = (lambda root, selector=value: root.css(selector), lambda node: node.text())
+        else:
+            compiled = soupsieve.compile(value)
+            steps[key] = (compiled.select, lambda element: element.text)
+    return steps
+
+
+def time_fields(corpus, engine, repeat):
+    """Returns {field: (select, text, join)} as the best seconds per page over `repeat` passes."""
+    roots = [parse_document(page, engine).root for page in corpus]
+    costs = {}
+    for key, (select, text) in field_steps(engine).items():
+        best = [float("inf")] * 3
+        for _ in range(repeat):
+            spent = [0.0] * 3
+            for root in roots:
+                start = time.perf_counter()
+                elements = select(root)
+                selected = time.perf_counter()
+                texts = [text(element) for element in elements]
+                read = time.perf_counter()
+                _join_texts(texts)
+                spent[0] += selected - start
+                spent[1] += read - selected
+                spent[2] += time.perf_counter() - read
+            best = [min(b, s) for b, s in zip(best, spent)]
+        costs[key] = tuple(b / len(roots) for b in best)
+    return costs
+
+
+def print_fields(corpus, engine, repeat):
+    """Prints the per-field cost of an engine, most expensive first, with its share of the total."""
+    costs = time_fields(corpus, engine, repeat)
+    total = sum(sum(cost) for cost in costs.values())
+    print(f"\n{engine}: per-field cost per page")
+    print(f"{'field':<18} {'select':>10} {'text':>10} {'join':>10} {'total':>10} {'share':>7}")
+    for key, cost in sorted(costs.items(), key=lambda item: -sum(item[1])):
+        per_page = [t * 1e6 for t in (*cost, sum(cost))]
+        print(f"{key:<18} " + " ".join(f"{t:7.1f} us" for t in per_page) + f" {sum(cost) / total:6.1%}")
+
+
+def run(copies, repeat, engines=None):
+    corpus = load_corpus(copies)
+    engines = [engine for engine in installed_engines() if not engines or engine in engines]
+    check_identical(corpus, engines)
+    print(f"{len(corpus)} pages, all of {', '.join(engines)} extract identical values")
+    print(f"{'engine':<12} {'extractor':<13} {'parse':>12} {'select':>12} {'total':>12}")
+    for engine in engines:
+        for name, extract in EXTRACTORS.items():
+            parse_time, select_time = time_engine(corpus, engine, extract, repeat)
+            per_page = [t * 1000 for t in (parse_time, select_time, parse_time + select_time)]
+            print(f"{engine:<12} {name:<13} " + " ".join(f"{t:9.3f} ms" for t in per_page))
+    for engine in engines:
+        print_fields(corpus, engine, repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Times parse_html with every installed parser engine.')
+    parser.add_argument('--copies', type=int, default=50, help='Copies of each saved page in the corpus. Default is 50.')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing repetitions; the best is reported. Default is 3.')
+    parser.add_argument('--engines', type=str, nargs='+', default=None, choices=PARSER_ENGINES,
+                        help='Parser engines to time. Default is every installed one.')
+    args = parser.parse_args()
+    run(args.copies, args.repeat, args.engines)
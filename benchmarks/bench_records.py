@@ -0,0 +1,106 @@
+"""
+Memory and conversion benchmark for scraped article records.
+
+Builds --count records (1M by default) from the fields of a parsed
+fixture page, once as the record dictionaries the scraper used to hold
+({"url": ..., **fields}) and once as slotted Articles. The url, pmid,
+pmcid, doi and title strings are distinct per record; the strings are
+built up front, so the memory reported per record is the container
+overhead alone. It then times converting each set of records to an
+Arrow table with records_to_arrow and to a pandas DataFrame. Run from
+the repository root:
+
+    python benchmarks/bench_records.py --count 1000000
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixture_server import load_corpus  # noqa: E402
+from scrape_pubmed import COLUMNS, ELEMENTS, Article, article_columns, parse_html, records_to_arrow  # noqa: E402
+
+DISTINCT = ("url", "pmid", "pmcid", "doi", "title")
+
+
+def build_columns(count):
+    """Returns the column -> values mapping the records are built from."""
+    template = parse_html(load_corpus(1)[0])
+    columns = {column: [template.get(column)] * count for column in COLUMNS}
+    for i in range(count):
+        pmid = str(30000000 + i)
+        columns["url"][i] = f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/"
+        columns["pmid"][i] = pmid
+        columns["pmcid"][i] = f"PMC{pmid}"
+        columns["doi"][i] = f"10.1016/j.jbi.2023.{pmid}"
+        columns["title"][i] = f"Asynchronous retrieval of biomedical literature at scale: a systematic review of {pmid}"
+    return columns
+
+
+def make_dicts(columns, count):
+    fields = list(ELEMENTS)
+    return [{"url": columns["url"][i], **{field: columns[field][i] for field in fields}} for i in range(count)]
+
+
+def make_articles(columns, count):
+    fields = list(ELEMENTS)
+    return [Article(columns["url"][i], **{field: columns[field][i] for field in fields}) for i in range(count)]
+
+
+def measure(build):
+    """Returns (result, bytes allocated and kept, seconds) for build()."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    kept, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, kept, elapsed
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def to_pandas_from_dicts(records):
+    import pandas as pd
+
+    return pd.DataFrame(records, columns=COLUMNS)
+
+
+def to_pandas_from_columns(records):
+    import pandas as pd
+
+    return pd.DataFrame(article_columns(records))
+
+
+def run(count, arrow):
+    columns = build_columns(count)
+    print(f"{count} records, {', '.join(DISTINCT)} distinct per record")
+    print(f"{'record':<8} {'overhead':>12} {'per record':>11} {'build':>9} {'to pandas':>10}" + (f" {'to arrow':>9}" if arrow else ""))
+    for name, build, to_pandas in (("dict", make_dicts, to_pandas_from_dicts),
+                                   ("Article", make_articles, to_pandas_from_columns)):
+        records, kept, elapsed = measure(lambda: build(columns, count))
+        line = (f"{name:<8} {kept / 1024 ** 2:>9.1f} MB {kept / count:>8.0f} B {elapsed:>7.2f} s"
+                f" {timed(to_pandas, records):>8.2f} s")
+        if arrow:
+            line += f" {timed(records_to_arrow, records):>7.2f} s"
+        print(line)
+        del records
+        gc.collect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compares the memory and conversion cost of dict and Article records.')
+    parser.add_argument('--count', type=int, default=1000000, help='Number of records. Default is 1000000.')
+    parser.add_argument('--no_arrow', action='store_true', help='Skip the Arrow conversion, e.g. without pyarrow installed.')
+    args = parser.parse_args()
+    run(args.count, not args.no_arrow)
@@ -0,0 +1,176 @@
+"""
+End-to-end benchmark suite for Scraper on the local fixture server.
+
+Starts fixture_server.py in its own process with the given latency,
+jitter, error rate and bandwidth, then runs the full scrape_pubmed.py
+command line once per --max_requests / --delay combination, each in a
+fresh process. Throughput and latency percentiles are taken from the
+run's --report_file, CPU time and peak memory from the finished
+process. The results are written to a JSON file named after the
+current commit, and --compare prints the change against an earlier
+results file. Run from the repository root:
+
+    python benchmarks/bench_scraper.py --count 2000 --max_requests 5 20 50 --delay 0 0.01
+    python benchmarks/bench_scraper.py --compare benchmarks/results/<commit>.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARKS_DIR)
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+
+sys.path.insert(0, ROOT_DIR)
+
+from fixture_server import fixture_urls  # noqa: E402
+
+
+def git_commit():
+    """Returns the short hash of the checked-out commit, or "unknown"."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def free_port():
+    """Returns a TCP port that is free on localhost."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, latency, jitter, error_rate, bandwidth):
+    """Starts fixture_server.py in a separate process and waits until it accepts connections."""
+    command = [sys.executable, os.path.join(BENCHMARKS_DIR, "fixture_server.py"), "--port", str(port),
+               "--latency", str(latency), "--jitter", str(jitter), "--error_rate", str(error_rate)]
+    if bandwidth:
+        command += ["--bandwidth", str(bandwidth)]
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("The fixture server did not start")
+
+
+def run_scraper(input_file, workdir, max_requests, delay, extra_args):
+    """Runs the scraper command line once and returns its report with CPU time and peak memory."""
+    report_file = os.path.join(workdir, "report.json")
+    output_file = os.path.join(workdir, "output.csv")
+    for path in (report_file, output_file, f"{output_file}.journal", f"{output_file}.failed.jsonl"):
+        if os.path.exists(path):
+            os.remove(path)
+    command = [sys.executable, os.path.join(ROOT_DIR, "scrape_pubmed.py"), "--input_file", input_file,
+               "--output_file", output_file, "--report_file", report_file, "--progress", "none",
+               "--max_requests", str(max_requests), "--delay", str(delay), "--backoff_base", "0.1",
+               *extra_args]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode:
+        raise RuntimeError(f"{' '.join(command)} exited with {process.returncode}")
+    with open(report_file, encoding="utf-8") as f:
+        report = json.load(f)
+    fetch = report["phases"].get("fetch", {})
+    return {
+        "max_requests": max_requests,
+        "delay": delay,
+        "elapsed": report["elapsed"],
+        "scraped": report["scraped"],
+        "failed": report["failed"],
+        "retries": report["retries"],
+        "pages_per_sec": report["pages_per_sec"],
+        "fetch_p50": fetch.get("p50"),
+        "fetch_p95": fetch.get("p95"),
+        "fetch_p99": fetch.get("p99"),
+        "cpu_seconds": usage.ru_utime + usage.ru_stime,
+        "peak_rss_mb": usage.ru_maxrss / 1024,
+    }
+
+
+def print_rows(rows, baseline=None):
+    """Prints one line per run, with the change in throughput against a matching baseline run."""
+    previous = {(row["max_requests"], row["delay"]): row for row in baseline or ()}
+    print(f"{'max_requests':>12} {'delay':>6} {'pages/s':>9} {'p50':>9} {'p95':>9} {'p99':>9} "
+          f"{'cpu s':>7} {'rss MB':>7}" + (f" {'vs base':>8}" if baseline else ""))
+    for row in rows:
+        times = [row[f"fetch_p{p}"] * 1000 if row[f"fetch_p{p}"] is not None else float("nan") for p in (50, 95, 99)]
+        line = (f"{row['max_requests']:>12} {row['delay']:>6} {row['pages_per_sec']:>9.1f} "
+                + " ".join(f"{t:>6.1f} ms" for t in times)
+                + f" {row['cpu_seconds']:>7.2f} {row['peak_rss_mb']:>7.1f}")
+        base = previous.get((row["max_requests"], row["delay"]))
+        if base:
+            line += f" {(row['pages_per_sec'] / base['pages_per_sec'] - 1) * 100:>+7.1f}%"
+        print(line)
+
+
+def run(args):
+    port = free_port()
+    server = start_server(port, args.latency, args.jitter, args.error_rate, args.bandwidth)
+    rows = []
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            input_file = os.path.join(workdir, "urls.txt")
+            base_url = f"http://127.0.0.1:{port}"
+            with open(input_file, "w", encoding="utf-8") as f:
+                f.write("\n".join(fixture_urls(base_url, args.count)) + "\n")
+            scraper_args = ["--pubmed_url", base_url, *args.scraper_args]
+            for max_requests in args.max_requests:
+                for delay in args.delay:
+                    rows.append(run_scraper(input_file, workdir, max_requests, delay, scraper_args))
+    finally:
+        server.terminate()
+        server.wait()
+    results = {
+        "commit": git_commit(),
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "settings": {"count": args.count, "latency": args.latency, "jitter": args.jitter,
+                     "error_rate": args.error_rate, "bandwidth": args.bandwidth,
+                     "scraper_args": args.scraper_args},
+        "runs": rows,
+    }
+    results_file = args.results_file or os.path.join(RESULTS_DIR, f"{results['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(results_file)), exist_ok=True)
+    with open(results_file, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["runs"]
+    print_rows(rows, baseline)
+    print(f"Results saved to {results_file}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Runs the full scraper against a local fixture server at several settings.')
+    parser.add_argument('--count', type=int, default=1000, help='Number of URLs scraped per run. Default is 1000.')
+    parser.add_argument('--max_requests', type=int, nargs='+', default=[5, 20, 50], help='Concurrency limits to run. Default is 5 20 50.')
+    parser.add_argument('--delay', type=float, nargs='+', default=[0], help='Delays between requests to run; 0 means no rate limit. Default is 0.')
+    parser.add_argument('--latency', type=float, default=0.05, help='Server latency in seconds. Default is 0.05.')
+    parser.add_argument('--jitter', type=float, default=0.02, help='Upper bound of random extra latency in seconds. Default is 0.02.')
+    parser.add_argument('--error_rate', type=float, default=0.0, help='Share of requests answered with a 503. Default is 0.')
+    parser.add_argument('--bandwidth', type=float, default=None, help='Bytes per second each response is streamed at. Default is unlimited.')
+    parser.add_argument('--results_file', type=str, default=None, help='JSON file the results are written to. Default is benchmarks/results/<commit>.json.')
+    parser.add_argument('--compare', type=str, default=None, help='Earlier results file to compare throughput against.')
+    parser.add_argument('scraper_args', nargs=argparse.REMAINDER, help='Extra scrape_pubmed.py options after --, e.g. -- --parser lxml.')
+    args = parser.parse_args()
+    if args.scraper_args[:1] == ['--']:
+        args.scraper_args = args.scraper_args[1:]
+    run(args)
@@ -0,0 +1,64 @@
+"""
+Before/after benchmark for HTTP session reuse.
+
+Fetches the same set of fixture URLs twice: once opening a fresh
+aiohttp.ClientSession per URL (the behaviour before pooling) and
+once through Scraper's pooled session. Run from the repository root:
+
+    python benchmarks/bench_session.py --count 2000 --max_requests 20
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixture_server import fixture_urls, start_fixture_server  # noqa: E402
+from scrape_pubmed import Scraper  # noqa: E402
+
+
+async def fetch_fresh_sessions(urls, max_requests):
+    """Old behaviour: one ClientSession (and TCP connection) per URL."""
+    semaphore = asyncio.Semaphore(max_requests)
+
+    async def fetch(url):
+        async with semaphore:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(url) as response:
+                    return await response.text()
+
+    await asyncio.gather(*(fetch(url) for url in urls))
+
+
+async def fetch_pooled_session(urls, max_requests):
+    """New behaviour: every fetch goes through Scraper's pooled session."""
+    async with Scraper(None, delay=0, max_requests=max_requests) as scraper:
+        await asyncio.gather(*(scraper.get_html_content(url) for url in urls))
+
+
+async def run(count, max_requests, latency):
+    runner, base_url = await start_fixture_server(latency=latency)
+    urls = fixture_urls(base_url, count)
+    try:
+        for name, strategy in (("fresh session per URL", fetch_fresh_sessions),
+                               ("pooled session", fetch_pooled_session)):
+            start = time.perf_counter()
+            await strategy(urls, max_requests)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<24} {elapsed:8.3f} s  {count / elapsed:10.1f} pages/s")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compares per-URL sessions against the pooled Scraper session on a local fixture server.')
+    parser.add_argument('--count', type=int, default=1000, help='Number of URLs to fetch. Default is 1000.')
+    parser.add_argument('--max_requests', type=int, default=20, help='Maximum number of concurrent requests. Default is 20.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Artificial server latency in seconds. Default is 0.')
+    args = parser.parse_args()
+    asyncio.run(run(args.count, args.max_requests, args.latency))
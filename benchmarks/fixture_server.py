@@ -0,0 +1,189 @@
+"""
+Local stand-in for pubmed.ncbi.nlm.nih.gov used by the benchmarks.
+
+Serves the saved article pages in fixtures/*.html for any /<pmid>/
+path, picking a page by PMID and substituting the PMID into it, replays
+the recorded EFetch XML in fixtures/pubmed_article.xml for
+/entrez/eutils/efetch.fcgi and answers /entrez/eutils/esearch.fcgi
+from a synthetic index, so the scraper can be run end to end without
+touching the network.
+
+It can also be run on its own, e.g. for the benchmark suite:
+
+    python benchmarks/fixture_server.py --port 8765 --latency 0.05 --jitter 0.02
+"""
+
+import argparse
+import asyncio
+import os
+import random
+from datetime import date, datetime, timedelta
+from string import Template
+
+from aiohttp import web
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_template(name="article.html"):
+    """Loads a saved article page as a string.Template keyed by $pmid."""
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return Template(f.read())
+
+
+def build_app(latency=0.0, error_rate=0.0, not_found=(), search_size=0, search_days=3650,
+              jitter=0.0, bandwidth=None):
+    """
+    Builds the aiohttp application that replays the article fixtures.
+
+    Every response waits latency seconds plus a uniform random delay of
+    up to jitter, and with bandwidth its body is streamed at that many
+    bytes per second. A share error_rate of requests is answered with a
+    503 carrying a Retry-After header, and the PMIDs in not_found are
+    answered with a 404.
+    ESearch matches every query against a synthetic index of search_size
+    articles published evenly over search_days from 2000/01/01, and
+    like PubMed refuses to page past the first 9,999 results.
+    """
+    templates = [load_template(name) for name in corpus_names()]
+    xml_template = load_template("pubmed_article.xml")
+    counts = {"article": 0, "efetch": 0, "esearch": 0, "errors": 0}
+    first_pmid = 30000000
+    published = [date(2000, 1, 1) + timedelta(days=i * search_days // max(1, search_size))
+                 for i in range(search_size)]
+    histories = {}
+
+    def parse_date(value):
+        return datetime.strptime(value, "%Y/%m/%d").date()
+
+    async def wait():
+        delay = latency + random.uniform(0, jitter) if jitter else latency
+        if delay:
+            await asyncio.sleep(delay)
+
+    async def respond(request, text, content_type):
+        if not bandwidth:
+            return web.Response(text=text, content_type=content_type)
+        body = text.encode()
+        response = web.StreamResponse(headers={"Content-Type": f"{content_type}; charset=utf-8"})
+        response.content_length = len(body)
+        await response.prepare(request)
+        chunk_size = 16 * 1024
+        for offset in range(0, len(body), chunk_size):
+            chunk = body[offset:offset + chunk_size]
+            await asyncio.sleep(len(chunk) / bandwidth)
+            await response.write(chunk)
+        await response.write_eof()
+        return response
+
+    async def esearch(request):
+        await wait()
+        counts["esearch"] += 1
+        params = dict(request.query)
+        params.update(await request.post())
+        mindate = parse_date(params.get("mindate", "1800/01/01"))
+        maxdate = parse_date(params.get("maxdate", "3000/01/01"))
+        pmids = [str(first_pmid + i) for i, day in enumerate(published) if mindate <= day <= maxdate]
+        webenv = f"MCID_{len(histories)}"
+        histories[webenv] = pmids
+        text = (f'<?xml version="1.0" ?>\n<eSearchResult><Count>{len(pmids)}</Count><RetMax>0</RetMax>'
+                f'<RetStart>0</RetStart><QueryKey>1</QueryKey><WebEnv>{webenv}</WebEnv><IdList/></eSearchResult>\n')
+        return web.Response(text=text, content_type="text/xml")
+
+    async def article(request):
+        await wait()
+        counts["article"] += 1
+        pmid = request.match_info["pmid"]
+        if pmid in not_found:
+            raise web.HTTPNotFound()
+        if error_rate and random.random() < error_rate:
+            counts["errors"] += 1
+            raise web.HTTPServiceUnavailable(headers={"Retry-After": "0"})
+        template = templates[int(pmid) % len(templates)]
+        return await respond(request, template.safe_substitute(pmid=pmid), "text/html")
+
+    async def efetch(request):
+        await wait()
+        counts["efetch"] += 1
+        if error_rate and random.random() < error_rate:
+            counts["errors"] += 1
+            raise web.HTTPServiceUnavailable(headers={"Retry-After": "0"})
+        params = dict(request.query)
+        params.update(await request.post())
+        if params.get("rettype") == "uilist":
+            retstart, retmax = int(params.get("retstart", 0)), int(params.get("retmax", 20))
+            if retstart + retmax > 9999:
+                raise web.HTTPBadRequest(text="Search Backend failed: Exception: retstart plus retmax exceeds 9999")
+            pmids = histories[params["WebEnv"]][retstart:retstart + retmax]
+            return web.Response(text="".join(f"{pmid}\n" for pmid in pmids), content_type="text/plain")
+        ids = [pmid for pmid in params.get("id", "").split(",") if pmid]
+        body = "".join(xml_template.safe_substitute(pmid=pmid) for pmid in ids)
+        text = f'<?xml version="1.0" ?>\n<PubmedArticleSet>\n{body}</PubmedArticleSet>\n'
+        return await respond(request, text, "text/xml")
+
+    app = web.Application()
+    app["counts"] = counts
+    app.router.add_route("*", "/entrez/eutils/efetch.fcgi", efetch)
+    app.router.add_route("*", "/entrez/eutils/esearch.fcgi", esearch)
+    app.router.add_get("/{pmid:\\d+}/", article)
+    app.router.add_get("/{pmid:\\d+}", article)
+    return app
+
+
+async def start_fixture_server(host="127.0.0.1", port=0, **kwargs):
+    """Starts the fixture server and returns (runner, base_url)."""
+    runner = web.AppRunner(build_app(**kwargs), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://{host}:{port}"
+
+
+def request_counts(runner):
+    """Returns the number of article and EFetch requests served so far."""
+    counts = dict(runner.app["counts"])
+    counts.pop("errors")
+    return counts
+
+
+def corpus_names():
+    """Returns the file names of the saved article pages in fixtures/."""
+    return sorted(name for name in os.listdir(FIXTURES_DIR) if name.endswith(".html"))
+
+
+def load_corpus(copies=1, first_pmid=30000000):
+    """Returns the saved article pages in fixtures/*.html, `copies` times each with distinct PMIDs."""
+    templates = [load_template(name) for name in corpus_names()]
+    return [template.safe_substitute(pmid=first_pmid + i * len(templates) + j)
+            for i in range(copies) for j, template in enumerate(templates)]
+
+
+def fixture_urls(base_url, count, first_pmid=30000000):
+    """Returns `count` article URLs on the fixture server."""
+    return [f"{base_url}/{first_pmid + i}/" for i in range(count)]
+
+
+async def serve(host, port, **kwargs):
+    runner, base_url = await start_fixture_server(host, port, **kwargs)
+    print(f"Serving fixtures on {base_url}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serves the PubMed fixtures locally until interrupted.')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Address to listen on. Default is 127.0.0.1.')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on. Default is 8765.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Artificial latency of every response in seconds. Default is 0.')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Upper bound of a uniform random delay added to the latency in seconds. Default is 0.')
+    parser.add_argument('--error_rate', type=float, default=0.0, help='Share of requests answered with a 503. Default is 0.')
+    parser.add_argument('--bandwidth', type=float, default=None, help='Bytes per second each response body is streamed at. Default is unlimited.')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                          error_rate=args.error_rate, bandwidth=args.bandwidth))
+    except KeyboardInterrupt:
+        pass
@@ -5,55 +5,1969 @@ Date: 2024-07-01
 
 This script is designed to perform asynchronous scraping of Pubmed, 
 a freely accessible database of academic research papers. It extracts 
-data based on a list of URLs provided in a CSV file and stores the 
-information in a DataFrame. The data is then exported to a CSV file 
-for subsequent analysis and processing. The asynchronous nature of 
+data based on a list of URLs provided in a CSV, text, JSONL or Parquet 
+file, which is streamed in chunks rather than loaded at once. The data is written to a CSV, JSONL or 
+Parquet file in batches as it is scraped, for subsequent analysis 
+and processing. The asynchronous nature of 
 the script allows for efficient and simultaneous data retrieval. 
 The script uses the aiohttp library for making HTTP requests, 
 BeautifulSoup for parsing HTML content, and asyncio for managing 
-asynchronous tasks. It also uses pandas for data manipulation and storage. 
+asynchronous tasks. pandas is only needed for the in-memory DataFrame 
+methods (load_data, scrape_all and save_results). 
 
 
 The script contains a Scraper class with the following methods:
 
     load_data: Loads the URLs from the CSV file into a pandas DataFrame.
-    get_html_content: Fetches the HTML content of a given URL.
-    scrape_data: Scrapes the data from a given URL and returns a dictionary of the scraped data.
+    iter_urls: Lazily yields the URLs from the input file in chunks.
+    open_session: Opens the pooled HTTP session shared by every fetch.
+    close_session: Closes the pooled HTTP session and its connections.
+    trace_config: Returns an aiohttp TraceConfig that times new connections.
+    fetch_content: Fetches the raw bytes of a given URL, POSTing form data when it is given.
+    get_html_content: Fetches the raw HTML content of a given URL.
+    scrape_data: Scrapes the data from a given URL and returns it as an Article.
+    scrape_iter: Scrapes URLs with a bounded pool of workers and yields results as they finish.
     scrape_all: Scrapes the data from all URLs in the DataFrame.
+    scrape_to_file: Scrapes the data from all URLs and writes it to a file in batches as it finishes.
     format_time: Formats the elapsed time into a readable string.
     print_results: Prints the results of the scraping process.
+    report: Returns the run report with per-phase timings, bytes and pages/sec.
+    save_report: Writes the run report to a JSON file.
     save_results: Saves the results to a CSV file.
 
+Request starts are spaced out by a RateLimiter, a token bucket that is
+separate from the concurrency cap, so --rate can be set to exactly the
+rate NCBI allows (3/s without an API key, 10/s with one).
+
+Results are written by a ResultWriter in batches as they finish, and a
+ProgressJournal records which URLs are done so that an interrupted run
+can be picked up again with --resume.
+Parquet output is written with a typed Arrow schema (see
+parquet_schema): an integer pmid, dictionary-encoded journal and
+publication_type, and authors as a list of names.
+
+Responses can be kept in an on-disk ResponseCache (e.g. under
+data/raw/cache), so that a re-run after a parser fix needs no network
+at all with --cache_only.
+
+Transient failures (connection errors, timeouts, 429 and 5xx) are
+retried by a RetryPolicy with exponential backoff and jitter, and URLs
+that still fail are written to a dead-letter file instead of aborting
+the run.
+
+With --adaptive, an AdaptiveConcurrency controller replaces the fixed
+concurrency cap and tunes it with additive increase and multiplicative
+decrease between --adaptive_min and --adaptive_max.
+
+Instead of an input file, a --query can be given: PubMedSearch runs it
+on ESearch with the history server and streams the matching article
+URLs straight into the scraper, splitting the date range as needed to
+get past PubMed's 9,999-record limit.
+
+Every URL's lifecycle is timed by RunStats: queue wait, rate-limit and
+semaphore wait, connect, time to first byte, download, parse and
+write. The run ends with p50/p95/p99 per phase, bytes transferred and
+pages/sec, and --report_file writes the same report as JSON so that
+regressions can be tracked between runs.
+While a run is going, Progress shows completed, failed and in-flight
+URLs, pages/sec over a sliding window and an ETA, as a tqdm bar on a
+terminal or as a log line every --progress_interval seconds otherwise.
+With --metrics_port, a MetricsServer on the same event loop exposes
+request, retry, latency, queue, concurrency, byte and memory metrics in
+the Prometheus text format for long-running background scrapes.
+
+PubMed article URLs (and bare PMIDs) are canonicalized and
+deduplicated by PMID before fetching: a row whose PMID is in flight or
+among the last --dedupe_window results gets that result written under
+its own URL. Deduplication is window-based: older duplicates are
+fetched again, and a compact PmidSet bitmap of every PMID seen only
+counts them for the run summary. Other URLs are fetched as given.
+
+Articles are fetched by a backend: HtmlBackend downloads each article
+page, while EFetchBackend requests PubMed XML for up to 200 PMIDs per
+E-utilities call and maps it onto the same columns.
+
+Article pages are parsed by parse_html with one of three engines
+(html.parser, lxml or selectolax) that all extract identical values.
+The ELEMENTS selectors are compiled once into an ExtractionPlan whose
+shared prefixes are resolved once per page.
+Parsing runs in a process pool so that it never blocks downloads on
+the event loop and scales across cores.
+
+For use as a library, scrape(urls, **options) is an async generator
+yielding one record per scraped URL on the caller's event loop, and
+scrape_sync(urls, **options) wraps it for synchronous code. Neither
+patches the event loop, and the command line runs under asyncio.run.
+
 The script also contains a main function that creates an instance of the 
 Scraper class, loads the data, scrapes the data, saves the results, and 
 prints the results. The script accepts the following command-line arguments:
 
-    --input_file: Path to the input CSV file containing URLs to be scraped.
-    --delay: Delay between each request in seconds. This is to prevent overloading the server with requests. Default is 1 second.
-    --max_requests: Maximum number of concurrent requests that can be made. This is to prevent overloading the server with too many requests at once. Default is 5.
+    --input_file: Path to the input file containing URLs to be scraped, or - for stdin. Required unless --query is given.
+    --input_format: Format of the input file (csv, txt, jsonl or parquet). Default is inferred from the file extension.
+    --chunksize: Number of rows read at a time from Parquet input; other formats are streamed line by line. Default is 100000.
+    --query: PubMed search term; the matching articles are scraped instead of an input file.
+    --mindate: Start of the --query date range as YYYY, YYYY/MM or YYYY/MM/DD. Default is 1800.
+    --maxdate: End of the --query date range. Default is today.
+    --datetype: Date the --query range applies to (pdat, edat or mdat). Default is pdat.
+    --pubmed_url: Base URL of the article pages built from --query results, also recognized as PubMed in input URLs.
+    --delay: Delay between each request in seconds, fractions allowed. Overrides --rate with 1 / delay requests per second when given.
+    --rate: Maximum number of requests per second, fractions allowed. Default is 3, NCBI's limit without an API key.
+    --burst: Number of requests that may start back to back before --rate applies. Default is 1.
+    --max_requests: Maximum number of concurrent requests that can be made, or the starting number with --adaptive. This is to prevent overloading the server with too many requests at once. Default is 5.
     --output_file: Path to the output CSV file where the scraped data will be saved.
+    --batch_size: Number of scraped records written to the output file at a time. Default is 1000.
+    --output_format: Format of the output file (csv, jsonl or parquet). Default is inferred from the file extension.
+    --compression: Compression codec of Parquet output (zstd, snappy, gzip, brotli, lz4 or none). Default is zstd.
+    --row_group_size: Maximum number of rows per Parquet row group. Default is the value of --batch_size.
+    --report_file: JSON file to which the run report with per-phase timings, bytes and pages/sec is written.
+    --progress: Live progress display (auto, bar, log or none). Default is auto, a tqdm bar on a terminal and log lines otherwise.
+    --progress_interval: Seconds between progress log lines. Default is 10.
+    --metrics_port: Port of a local /metrics endpoint in the Prometheus text format, e.g. 9464. Default is no endpoint.
+    --metrics_host: Address the metrics endpoint listens on. Default is 127.0.0.1.
+    --journal_file: Path to the SQLite journal recording which URLs are done. Default is the output file path followed by .journal.
+    --resume: Skip URLs the journal lists as done, retry failed ones and append to the existing output file.
+    --backend: Fetch backend, html for article pages or efetch for E-utilities XML. Default is html.
+    --api_key: NCBI API key sent with E-utilities requests.
+    --eutils_url: Base URL of the E-utilities service. Default is https://eutils.ncbi.nlm.nih.gov/entrez/eutils.
+    --efetch_batch_size: Number of PMIDs requested per EFetch call. Default is 200.
+    --parser: HTML parser used to extract fields from article pages (html.parser, lxml or selectolax). Default is html.parser.
+    --parse_workers: Number of processes parsing article pages. 0 parses on the event loop. Default is the number of CPUs.
+    --cache_dir: Directory of the on-disk response cache, e.g. data/raw/cache. Default is no cache.
+    --cache_ttl: Seconds a cached response stays fresh. Default is to keep responses forever.
+    --cache_max_size: Maximum size of the cached responses in megabytes. Default is 10240.
+    --cache_only: Serve every response from the cache and never touch the network.
+    --refresh: Ignore cached responses and fetch every URL again, storing the fresh responses.
+    --max_attempts: Maximum number of attempts per URL; transient failures are retried. Default is 4.
+    --backoff_base: Backoff before the first retry in seconds, doubled for every later one. Default is 1.
+    --backoff_max: Upper bound on a single backoff in seconds. Default is 60.
+    --dead_letter_file: JSONL file listing URLs that could not be fetched, emptied at the start of a run unless --resume is given. Default is the output file path followed by .failed.jsonl.
+    --adaptive: Adjust the number of concurrent requests while scraping, starting from --max_requests.
+    --adaptive_min: Lower bound on concurrent requests with --adaptive. Default is 1.
+    --adaptive_max: Upper bound on concurrent requests with --adaptive. Default is 50.
+    --keep_duplicates: Fetch every input URL as given instead of answering duplicate PMIDs in flight or within --dedupe_window from one fetch.
+    --dedupe_window: Number of recent results kept to answer late duplicate rows. Default is 10000.
+    --loop: Event loop implementation (asyncio or uvloop). Falls back to asyncio if uvloop is not installed. Default is asyncio.
+    --workers: Number of workers pulling URLs from the queue. Default is the value of --max_requests.
+    --queue_size: Maximum number of URLs and results waiting in the queues. Default is twice the number of workers.
+    --limit_per_host: Maximum number of pooled connections to a single host. Default is the value of --max_requests.
+    --keepalive_timeout: Seconds an idle pooled connection is kept open for reuse. Default is 30 seconds.
+    --dns_cache_ttl: Seconds a resolved host address is cached. Default is 300 seconds.
+
+Heavy dependencies are imported by the code paths that need them rather
+than at module load, so --help and short runs start quickly and the
+streaming CSV, JSONL and Parquet paths run without pandas;
+tests/test_import_time.py checks the import time against a budget.
 
 Requires:
 
-    pandas
     datetime
+    sqlite3
+    zlib
     beautifulsoup4
     aiohttp
     asyncio
     argparse
-    nest_asyncio 
+    soupsieve
+    pandas (optional, for load_data, scrape_all and save_results)
+    tqdm (optional, for the progress bar)
+    pyarrow (optional, for Parquet output)
+    lxml (optional, for --parser lxml)
+    selectolax (optional, for --parser selectolax)
+    uvloop (optional, for --loop uvloop)
 
 """
 
 import argparse
-import pandas as pd
-import aiohttp
+import csv
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import threading
+import xml.etree.ElementTree as ET
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 import asyncio
-from datetime import datetime
-from bs4 import BeautifulSoup
-import nest_asyncio
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from collections.abc import Collection
+from datetime import date, datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache, partial
+from operator import attrgetter
+
+ELEMENTS = {
+    "title": "header#heading.heading div#full-view-heading.full-view h1.heading-title",
+    "publication_type": "header#heading.heading div#short-view-heading.short-view div.publication-type",
+    "journal": "header#heading.heading div#full-view-heading.full-view div.article-citation div.article-source div.journal-actions.dropdown-block button#full-view-journal-trigger.journal-actions-trigger.trigger",
+    "coi": "div#conflict-of-interest.conflict-of-interest div.statement p",
+    "grants": "div#grants.grants",
+    "authors": "header#heading.heading div#full-view-heading.full-view div.inline-authors div.authors div.authors-list",
+    "abstracts": "div#abstract.abstract div#eng-abstract.abstract-content.selected",
+    "pmid": "header#heading.heading div#full-view-heading.full-view ul#full-view-identifiers.identifiers li span.identifier.pubmed strong.current-id",
+    "pmcid": "header#heading.heading div#full-view-heading.full-view ul#full-view-identifiers.identifiers li span.identifier.pmc a.id-link",
+    "doi": "header#heading.heading div#full-view-heading.full-view ul#full-view-identifiers.identifiers li span.identifier.doi a.id-link",
+    "citation": "header#heading.heading div#full-view-heading.full-view div.article-citation div.article-source span.cit",
+    "erratum": "main#article-details.article-details div#linked-correction-forward.linked-articles",
+}
+
+COLUMNS = ["url", *ELEMENTS]
+
+
+class Article:
+    """
+    A scraped article: its url and the ELEMENTS fields, None where a field is missing.
+
+    A slotted record rather than a dictionary, so each article is one
+    small fixed-size object instead of a hash table with twelve keys.
+    It supports keys, get and item access, so dict(article) works and
+    it can stand in where a record dictionary was expected. Use
+    article_columns to turn many articles into columns for Arrow or
+    pandas without building a dictionary per article.
+
+    Attributes
+    ----------
+    url : str
+        The URL the article was scraped for (default None).
+    title, publication_type, journal, ... : str
+        One attribute per ELEMENTS field (default None).
+    """
+
+    __slots__ = tuple(COLUMNS)
+
+    def __init__(self, url=None, title=None, publication_type=None, journal=None, coi=None,
+                 grants=None, authors=None, abstracts=None, pmid=None, pmcid=None, doi=None,
+                 citation=None, erratum=None):
+        self.url = url
+        self.title = title
+        self.publication_type = publication_type
+        self.journal = journal
+        self.coi = coi
+        self.grants = grants
+        self.authors = authors
+        self.abstracts = abstracts
+        self.pmid = pmid
+        self.pmcid = pmcid
+        self.doi = doi
+        self.citation = citation
+        self.erratum = erratum
+
+    def __repr__(self):
+        return f"Article(url={self.url!r}, pmid={self.pmid!r}, title={self.title!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Article):
+            return NotImplemented
+        return all(getattr(self, column) == getattr(other, column) for column in COLUMNS)
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(COLUMNS)
+
+    def keys(self):
+        """Returns the column names, url first."""
+        return list(COLUMNS)
+
+    def values(self):
+        """Returns the column values as a tuple, in COLUMNS order."""
+        return _ARTICLE_VALUES(self)
+
+    def get(self, key, default=None):
+        """Returns a column's value, or default for an unknown column."""
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def with_url(self, url):
+        """Returns a copy of the article for another url, e.g. a duplicate row of the same PMID."""
+        return Article(url, *self.values()[1:])
+
+
+_ARTICLE_VALUES = attrgetter(*COLUMNS)
+
+
+def article_columns(records):
+    """
+    Returns a column -> list of values mapping for Articles or record dictionaries.
+
+    None entries (failed URLs) become rows of None. The values are the
+    records' own strings, so building a DataFrame or Arrow arrays from
+    the columns does not go through a dictionary per row.
+    """
+    empty = (None,) * len(COLUMNS)
+    rows = [empty if record is None
+            else record.values() if isinstance(record, Article)
+            else tuple(record.get(column) for column in COLUMNS)
+            for record in records]
+    if not rows:
+        return {column: [] for column in COLUMNS}
+    return {column: list(values) for column, values in zip(COLUMNS, zip(*rows))}
+
+EUTILS_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+
+PUBMED_URL = "https://pubmed.ncbi.nlm.nih.gov"
+
+PUBMED_PATHS = (("pubmed.ncbi.nlm.nih.gov", "/"), ("www.ncbi.nlm.nih.gov", "/pubmed/"),
+                ("ncbi.nlm.nih.gov", "/pubmed/"))
+
+BARE_PMID = re.compile(r"[0-9]+")
+
+PMID_PATH = re.compile(r"([0-9]+)/?")
+
+
+@lru_cache(maxsize=16)
+def _pubmed_paths(pubmed_url):
+    """Returns the (host, path prefix) pairs of PubMed article URLs, including those under pubmed_url."""
+    base = urlsplit(pubmed_url)
+    return (*PUBMED_PATHS, (base.netloc.lower(), base.path.rstrip("/") + "/"))
+
+
+def extract_pmid(url, pubmed_url=PUBMED_URL):
+    """
+    Returns the PMID of a PubMed article URL or bare PMID, or None for any other URL.
+
+    Article URLs are https://pubmed.ncbi.nlm.nih.gov/<pmid>/, legacy
+    www.ncbi.nlm.nih.gov/pubmed/<pmid> links and <pubmed_url>/<pmid>/,
+    e.g. on a mirror, over http or https and with any query or
+    fragment. Other URLs ending in digits, such as
+    www.ncbi.nlm.nih.gov/gene/672, are not PubMed articles.
+    """
+    url = str(url).strip()
+    if BARE_PMID.fullmatch(url):
+        return url
+    parts = urlsplit(url)
+    if parts.scheme.lower() not in ("http", "https"):
+        return None
+    host = parts.netloc.lower()
+    for article_host, prefix in _pubmed_paths(pubmed_url.rstrip("/")):
+        if host == article_host and parts.path.startswith(prefix):
+            match = PMID_PATH.fullmatch(parts.path[len(prefix):])
+            if match:
+                return match.group(1)
+    return None
+
+
+def canonical_url(url, pubmed_url=PUBMED_URL):
+    """
+    Returns the canonical form of a PubMed article URL.
+
+    Article URLs on NCBI hosts become https://pubmed.ncbi.nlm.nih.gov/<pmid>/,
+    while bare PMIDs and article URLs under pubmed_url become
+    <pubmed_url>/<pmid>/. Every other URL is returned unchanged.
+    """
+    pmid = extract_pmid(url, pubmed_url)
+    if pmid is None:
+        return url
+    host = urlsplit(str(url).strip()).netloc.lower()
+    if host.endswith("ncbi.nlm.nih.gov"):
+        return f"{PUBMED_URL}/{pmid}/"
+    return f"{pubmed_url.rstrip('/')}/{pmid}/"
+
+
+class PmidSet:
+    """
+    A compact set of integer PMIDs, stored as a bitmap.
+
+    One bit per possible PMID, so the roughly 40 million PMIDs issued so
+    far fit in about 5 MB however many of them are added, instead of
+    tens of bytes per entry in a set of strings. MAX_PMID bounds the
+    bitmap at 12.5 MB; larger numbers are not treated as PMIDs.
+    scrape_iter uses it to count PMIDs fetched again after they left
+    the dedupe window, not to skip them.
+    """
+
+    __slots__ = ("bits",)
+
+    MAX_PMID = 10 ** 8
+
+    def __init__(self):
+        self.bits = bytearray()
+
+    def __contains__(self, pmid):
+        byte = pmid >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] & (1 << (pmid & 7)))
+
+    def add(self, pmid):
+        """Adds a PMID; values above MAX_PMID are rejected with a ValueError."""
+        if not 0 <= pmid <= self.MAX_PMID:
+            raise ValueError(f"PMID out of range: {pmid}")
+        byte = pmid >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(max(byte + 1, 2 * len(self.bits)) - len(self.bits)))
+        self.bits[byte] |= 1 << (pmid & 7)
+
+class RateLimiter:
+    """
+    A token bucket that spaces out request starts.
+
+    Attributes
+    ----------
+    rate : float
+        Tokens added per second, None or 0 to disable limiting.
+    burst : int
+        Maximum number of tokens the bucket can hold (default 1).
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Waits until a token is available and takes it."""
+        if not self.rate:
+            return
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AdaptiveConcurrency:
+    """
+    An AIMD controller that adjusts the number of concurrent requests.
+
+    Used in place of a fixed semaphore. After every `limit` healthy
+    responses the limit grows by one; on an overload signal (429, 503,
+    a timeout or connection error) or when recent latency rises above
+    latency_factor times its long-run average, it is multiplied by
+    decrease, at most once per `limit` responses.
+
+    Attributes
+    ----------
+    limit : int
+        Current number of requests allowed in flight.
+    min_limit : int
+        Lower bound on the limit (default 1).
+    max_limit : int
+        Upper bound on the limit (default 50).
+    decrease : float
+        Factor applied to the limit on overload (default 0.5).
+    latency_factor : float
+        Ratio of recent to long-run latency treated as a spike (default 2).
+    """
+
+    def __init__(self, initial, min_limit=1, max_limit=50, decrease=0.5, latency_factor=2):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = min(max_limit, max(min_limit, initial))
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.in_flight = 0
+        self.healthy = 0
+        self.since_decrease = 0
+        self.recent_latency = None
+        self.baseline_latency = None
+        self.condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify(max(1, self.limit - self.in_flight))
+
+    def record(self, latency=None, overloaded=False):
+        """Records the outcome of one request and adjusts the limit."""
+        self.since_decrease += 1
+        spike = False
+        if latency is not None:
+            if self.baseline_latency is None:
+                self.recent_latency = self.baseline_latency = latency
+            self.recent_latency += 0.3 * (latency - self.recent_latency)
+            self.baseline_latency += 0.02 * (latency - self.baseline_latency)
+            spike = self.recent_latency > self.latency_factor * self.baseline_latency
+        if overloaded or spike:
+            self.healthy = 0
+            if self.since_decrease >= self.limit:
+                self.set_limit(int(self.limit * self.decrease))
+                self.since_decrease = 0
+            return
+        self.healthy += 1
+        if self.healthy >= self.limit:
+            self.healthy = 0
+            self.set_limit(self.limit + 1)
+
+    def set_limit(self, limit):
+        """Moves the limit within its bounds; Progress and MetricsServer show the current value."""
+        self.limit = min(self.max_limit, max(self.min_limit, limit))
+
+
+class FetchError(Exception):
+    """
+    Raised when a URL could not be fetched within its attempt budget.
+
+    Attributes
+    ----------
+    url : str
+        The URL that failed.
+    reason : str
+        The last failure, e.g. "HTTP 503" or "ServerDisconnectedError: ...".
+    attempts : int
+        Number of attempts made.
+    """
+
+    def __init__(self, url, reason, attempts):
+        super().__init__(f"{url} failed after {attempts} attempt(s): {reason}")
+        self.url = url
+        self.reason = reason
+        self.attempts = attempts
+
+
+class RetryPolicy:
+    """
+    A class used to decide whether and when a failed fetch is retried.
+
+    Connection errors, timeouts, 429 and 5xx responses are transient and
+    retried with exponential backoff and full jitter, waiting at least
+    as long as the server's Retry-After header asks. Other failures,
+    such as a 404, are permanent and not retried.
+
+    Attributes
+    ----------
+    max_attempts : int
+        Maximum number of attempts per URL, including the first (default 4).
+    base_delay : float
+        Backoff before the second attempt in seconds, doubled for every later one (default 1).
+    max_delay : float
+        Upper bound on a single backoff in seconds (default 60).
+    """
+
+    RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+    def __init__(self, max_attempts=4, base_delay=1, max_delay=60):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def is_transient(self, status=None, exc=None):
+        """Returns True if a failed response status or exception is worth retrying."""
+        if exc is not None:
+            import aiohttp
+
+            return isinstance(exc, (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError))
+        return status in self.RETRY_STATUSES
+
+    def backoff(self, attempt, retry_after=None):
+        """Returns the seconds to wait after a given failed attempt (1-based)."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        return max(delay, self.parse_retry_after(retry_after))
+
+    def parse_retry_after(self, value):
+        """Returns the seconds asked for by a Retry-After header, capped at max_delay."""
+        if not value:
+            return 0
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                return 0
+        return min(self.max_delay, max(0, seconds))
+
+
+class RunStats:
+    """
+    A class used to time every phase of each URL's lifecycle during a run.
+
+    Durations are kept in a reservoir of at most max_samples per phase,
+    so percentiles stay exact for runs up to that size and memory stays
+    bounded beyond it, while counts and totals are always exact. connect
+    is only recorded for requests that opened a new connection, ttfb
+    runs from the request start to the response headers less connect,
+    and fetch is the whole request, failed ones included. Every phase is
+    also counted into cumulative BUCKETS for the Prometheus histograms
+    of MetricsServer.
+
+    Attributes
+    ----------
+    max_samples : int
+        Maximum number of durations kept per phase for percentiles (default 100000).
+    """
+
+    PHASES = ("queue", "rate_limit", "semaphore", "connect", "ttfb", "download", "fetch", "parse", "write")
+    PERCENTILES = (50, 95, 99)
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, max_samples=100000):
+        self.max_samples = max_samples
+        self.samples = {phase: array("d") for phase in self.PHASES}
+        self.counts = dict.fromkeys(self.PHASES, 0)
+        self.totals = dict.fromkeys(self.PHASES, 0.0)
+        self.buckets = {phase: [0] * (len(self.BUCKETS) + 1) for phase in self.PHASES}
+        self.statuses = {}
+        self.bytes = 0
+        self.requests = 0
+        self.cache_hits = 0
+        self.reset()
+
+    def reset(self):
+        """Restarts the wall clock of the run."""
+        self.started = time.perf_counter()
+
+    def record(self, phase, seconds):
+        """Records the duration of one phase of one URL or batch."""
+        self.counts[phase] += 1
+        self.totals[phase] += seconds
+        self.buckets[phase][bisect_left(self.BUCKETS, seconds)] += 1
+        samples = self.samples[phase]
+        if len(samples) < self.max_samples:
+            samples.append(seconds)
+        else:
+            slot = random.randrange(self.counts[phase])
+            if slot < self.max_samples:
+                samples[slot] = seconds
+
+    def status(self, status):
+        """Counts a response status, or "error" for a request that raised."""
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def summary(self, phase):
+        """Returns the count, mean, percentiles and maximum of a phase in seconds."""
+        count = self.counts[phase]
+        samples = sorted(self.samples[phase])
+        summary = {"count": count, "mean": self.totals[phase] / count if count else None}
+        for percentile in self.PERCENTILES:
+            rank = max(0, -(-percentile * len(samples) // 100) - 1)
+            summary[f"p{percentile}"] = samples[rank] if samples else None
+        summary["max"] = samples[-1] if samples else None
+        return summary
+
+    def report(self, scraped=0, failed=0, **extra):
+        """Returns the run report as a JSON-serialisable dictionary."""
+        elapsed = time.perf_counter() - self.started
+        return {
+            "elapsed": elapsed,
+            "scraped": scraped,
+            "failed": failed,
+            **extra,
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "bytes": self.bytes,
+            "statuses": {str(status): count for status, count in self.statuses.items()},
+            "pages_per_sec": scraped / elapsed if elapsed else None,
+            "phases": {phase: self.summary(phase) for phase in self.PHASES if self.counts[phase]},
+        }
+
+    def format_report(self, report):
+        """Formats the phases of a report as a table of milliseconds."""
+        lines = [f"{'phase':<11}{'count':>9}" + "".join(f"{f'p{p}':>11}" for p in self.PERCENTILES) + f"{'max':>11}"]
+        for phase, summary in report["phases"].items():
+            times = [summary[f"p{p}"] for p in self.PERCENTILES] + [summary["max"]]
+            lines.append(f"{phase:<11}{summary['count']:>9}" + "".join(f"{t * 1000:>8.1f} ms" for t in times))
+        return "\n".join(lines)
+
+
+class Progress:
+    """
+    A class used to show the live progress of a run.
+
+    Shows completed, failed and in-flight URLs, pages/sec over a sliding
+    window, an ETA when the total is known and the adaptive concurrency
+    limit. The counters are read off the scraper by a task that wakes up
+    every refresh seconds, so scraping a page only costs the counter
+    increments it already makes. A tqdm bar is drawn on a terminal; when
+    stdout is not a TTY, or tqdm is not installed, a log line is printed
+    every log_interval seconds instead. With count, the total is found
+    in a thread while the run goes on, and the ETA is shown once it is
+    known; a total set on the scraper during the run, as PubMedSearch
+    does from the match count of its query, is picked up the same way.
+
+    Attributes
+    ----------
+    scraper : Scraper
+        The scraper whose scraped, failed, in_flight and controller are shown.
+    total : int
+        Number of URLs expected in the run, None if unknown (default None).
+    mode : str
+        "bar", "log", "none", or "auto" for a bar on a terminal and log lines otherwise (default "auto").
+    log_interval : float
+        Seconds between log lines (default 10).
+    window : float
+        Seconds over which pages/sec and the ETA are measured (default 10).
+    refresh : float
+        Seconds between redraws of the bar (default 0.5).
+    count : callable
+        Returns the number of URLs, run in a thread when total is None, e.g. count_urls (default None).
+    skip : int
+        Number of URLs included in count that the run skips, e.g. on resume (default 0).
+    """
+
+    def __init__(self, scraper, total=None, mode="auto", log_interval=10, window=10, refresh=0.5,
+                 count=None, skip=0):
+        if mode == "auto":
+            mode = "bar" if sys.stdout.isatty() else "log"
+        self.scraper = scraper
+        self.total = total
+        self.count = count
+        self.skip = skip
+        self.counter = None
+        self.mode = mode
+        self.log_interval = log_interval
+        self.window = window
+        self.refresh = refresh
+        self.bar = None
+        self.task = None
+        self.samples = deque()
+
+    async def __aenter__(self):
+        if self.mode == "none":
+            return self
+        if self.mode == "bar":
+            try:
+                from tqdm import tqdm
+            except ImportError:
+                self.mode = "log"
+            else:
+                self.bar = tqdm(total=self.total, unit="page", file=sys.stdout, mininterval=float("inf"),
+                                bar_format=self.bar_format(self.total))
+        self.samples.append((time.perf_counter(), 0))
+        self.task = asyncio.ensure_future(self.run())
+        if self.total is None and self.count is not None:
+            self.counter = asyncio.ensure_future(self.count_total())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        for task in (self.task, self.counter):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        if self.bar is not None:
+            completed = self.scraper.scraped + self.scraper.failed
+            if exc_type is None and self.total and completed < self.total:
+                # count is an upper bound when the input has blank or multi-line rows.
+                self.set_total(completed)
+            self.show()
+            self.bar.close()
+
+    async def count_total(self):
+        """Runs count in a thread and sets the total once it returns."""
+        total = await asyncio.get_running_loop().run_in_executor(None, self.count)
+        if total is not None:
+            self.set_total(max(0, total - self.skip))
+
+    def set_total(self, total):
+        """Sets the number of URLs expected, switching the bar to a percentage once it is known."""
+        self.total = total
+        if self.bar is not None:
+            self.bar.total = total
+            self.bar.bar_format = self.bar_format(total)
+
+    @staticmethod
+    def bar_format(total):
+        """Returns the tqdm bar format, with a percentage only when the total is known."""
+        counter = "{percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt}" if total else "{n_fmt}"
+        return counter + " [{elapsed}{postfix}]"
+
+    async def run(self):
+        """Shows the progress every refresh (bar) or log_interval (log) seconds until cancelled."""
+        interval = self.refresh if self.bar is not None else self.log_interval
+        while True:
+            await asyncio.sleep(interval)
+            self.show()
+
+    def measure(self):
+        """Returns (completed, pages/sec over the window, ETA in seconds or None)."""
+        now = time.perf_counter()
+        completed = self.scraper.scraped + self.scraper.failed
+        self.samples.append((now, completed))
+        while len(self.samples) > 2 and now - self.samples[1][0] >= self.window:
+            self.samples.popleft()
+        since, before = self.samples[0]
+        rate = (completed - before) / (now - since) if now > since else 0.0
+        eta = max(0, self.total - completed) / rate if self.total and rate else None
+        return completed, rate, eta
+
+    def show(self):
+        """Redraws the bar or prints a log line with the current progress."""
+        if self.total is None and self.scraper.total is not None:
+            self.set_total(max(0, self.scraper.total - self.skip))
+        completed, rate, eta = self.measure()
+        status = f"{self.scraper.failed} failed, {self.scraper.in_flight} in flight, {rate:.1f} pages/s"
+        if eta is not None:
+            status += f", ETA {timedelta(seconds=round(eta))}"
+        if self.scraper.controller is not None:
+            status += f", limit {self.scraper.controller.limit}"
+        if self.bar is not None:
+            self.bar.n = completed
+            self.bar.set_postfix_str(status, refresh=False)
+            self.bar.refresh()
+        else:
+            done = f"{completed}/{self.total}" if self.total else f"{completed}"
+            print(f"Progress: {done} URLs done, {status}", flush=True)
+
+
+def rss_bytes():
+    """Returns the resident set size of this process in bytes, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class MetricsServer:
+    """
+    A class used to expose the metrics of a running scrape to Prometheus.
+
+    Serves /metrics in the Prometheus text format from the scraper's own
+    event loop, with no extra threads: responses by status, retries,
+    histograms of every RunStats phase (fetch and parse latency among
+    them), queue depth, current concurrency, bytes in and RSS. The
+    metrics are rendered from the scraper's counters on each scrape.
+
+    Attributes
+    ----------
+    scraper : Scraper
+        The scraper whose counters and stats are exposed.
+    host : str
+        Address the endpoint listens on (default "127.0.0.1").
+    port : int
+        Port the endpoint listens on, 0 for any free port (default 9464).
+    """
+
+    PREFIX = "pubmed_scraper"
+
+    def __init__(self, scraper, host="127.0.0.1", port=9464):
+        self.scraper = scraper
+        self.host = host
+        self.port = port
+        self.runner = None
+
+    async def start(self):
+        """Starts serving /metrics on the running event loop."""
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        self.port = self.runner.addresses[0][1]
+        print(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def close(self):
+        """Stops serving /metrics."""
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def handle(self, request):
+        """Answers a scrape of /metrics."""
+        from aiohttp import web
+
+        return web.Response(text=self.render(), content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    def render(self):
+        """Returns every metric in the Prometheus text exposition format."""
+        scraper, stats = self.scraper, self.scraper.stats
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            name = f"{self.PREFIX}_{name}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                label_text = ",".join(f'{key}="{label}"' for key, label in labels.items())
+                lines.append(f"{name}{suffix}{{{label_text}}} {value}" if labels else f"{name}{suffix} {value}")
+
+        metric("requests_total", "counter", "HTTP requests sent, by response status or error.",
+               [("", {"status": status}, count) for status, count in stats.statuses.items()])
+        metric("retries_total", "counter", "Requests retried after a transient failure.", [("", {}, scraper.retries)])
+        metric("cache_hits_total", "counter", "Responses served from the response cache.", [("", {}, stats.cache_hits)])
+        metric("scraped_total", "counter", "URLs scraped.", [("", {}, scraper.scraped)])
+        metric("failed_total", "counter", "URLs that could not be scraped.", [("", {}, scraper.failed)])
+        metric("received_bytes_total", "counter", "Response body bytes received from the network.", [("", {}, stats.bytes)])
+
+        histogram = []
+        for phase in stats.PHASES:
+            cumulative = 0
+            for bound, count in zip((*stats.BUCKETS, "+Inf"), stats.buckets[phase]):
+                cumulative += count
+                histogram.append(("_bucket", {"phase": phase, "le": bound}, cumulative))
+            histogram.append(("_sum", {"phase": phase}, stats.totals[phase]))
+            histogram.append(("_count", {"phase": phase}, stats.counts[phase]))
+        metric("phase_seconds", "histogram", "Duration of each phase of a URL's lifecycle, see RunStats.", histogram)
+
+        metric("queue_depth", "gauge", "Batches of URLs waiting for a worker and results waiting to be written.",
+               [("", {"queue": name}, queue.qsize()) for name, queue in scraper.queues.items()])
+        metric("in_flight", "gauge", "URLs being fetched or parsed.", [("", {}, scraper.in_flight)])
+        limit = scraper.controller.limit if scraper.controller is not None else scraper.max_requests
+        metric("concurrency_limit", "gauge", "Current maximum number of concurrent requests.", [("", {}, limit)])
+        rss = rss_bytes()
+        if rss is not None:
+            metric("resident_memory_bytes", "gauge", "Resident set size of the scraper process.", [("", {}, rss)])
+        return "\n".join(lines) + "\n"
+
+
+def parquet_schema():
+    """
+    Returns the Arrow schema of the Parquet output.
+
+    pmid is an integer, journal and publication_type are dictionary
+    encoded since few distinct values repeat across many rows, the long
+    coi and abstracts texts are large strings, and authors is a list.
+    """
+    import pyarrow as pa
+
+    types = dict.fromkeys(COLUMNS, pa.string())
+    types.update({
+        "pmid": pa.int64(),
+        "journal": pa.dictionary(pa.int32(), pa.string()),
+        "publication_type": pa.dictionary(pa.int32(), pa.string()),
+        "coi": pa.large_string(),
+        "abstracts": pa.large_string(),
+        "authors": pa.list_(pa.string()),
+    })
+    return pa.schema([(column, types[column]) for column in COLUMNS])
+
+
+AUTHOR_SUFFIX = re.compile(r"[\d\s,]+$")
+
+
+def split_authors(authors):
+    """Splits an authors field into names, dropping affiliation numbers and separators."""
+    if "\n" in authors:
+        names = authors.split("\n")
+    else:
+        names = authors.split(", ")
+    return [name for name in (AUTHOR_SUFFIX.sub("", name).strip() for name in names) if name]
+
+
+def records_to_arrow(records):
+    """Converts scraped records into an Arrow table with the parquet_schema types."""
+    import pyarrow as pa
+
+    schema = parquet_schema()
+    values_by_column = article_columns(records)
+    columns = []
+    for field in schema:
+        values = values_by_column[field.name]
+        if field.name == "pmid":
+            values = [None if value is None else int(value) for value in values]
+        elif field.name == "authors":
+            values = [None if value is None else split_authors(value) for value in values]
+        if pa.types.is_dictionary(field.type):
+            columns.append(pa.array(values, pa.string()).dictionary_encode())
+        else:
+            columns.append(pa.array(values, field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+class ResultWriter:
+    """
+    A class used to write scraped records to disk in batches as they finish.
+
+    Attributes
+    ----------
+    output_file : str
+        Path to the output file. Any existing file is replaced.
+    batch_size : int
+        Number of records buffered before they are written (default 1000).
+    output_format : str
+        One of "csv", "jsonl" or "parquet" (default inferred from the file extension).
+    append : bool
+        Append to an existing CSV or JSONL file instead of replacing it (default False).
+    compression : str
+        Parquet compression codec, e.g. "snappy", "zstd", "gzip" or "none" (default "zstd").
+    row_group_size : int
+        Maximum number of rows per Parquet row group (default batch_size).
+    """
+
+    FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet"}
+
+    def __init__(self, output_file, batch_size=1000, output_format=None, append=False,
+                 compression="zstd", row_group_size=None):
+        self.output_file = output_file
+        self.batch_size = batch_size
+        self.compression = compression
+        self.row_group_size = row_group_size or batch_size
+        self.output_format = output_format or self.FORMATS.get(
+            os.path.splitext(output_file)[1].lower(), "csv")
+        self.batch = []
+        self.written = 0
+        self.parquet_writer = None
+        if append and self.output_format == "parquet":
+            raise ValueError("Parquet output cannot be appended to; resume into a CSV or JSONL file")
+        if not append:
+            open(output_file, "w").close()
+        self.header = not (append and os.path.exists(output_file) and os.path.getsize(output_file) > 0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, record):
+        """Buffers a record and writes the batch once it is full."""
+        self.batch.append(record)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered records to the output file."""
+        if not self.batch:
+            return
+        if self.output_format == "parquet":
+            self.write_parquet(self.batch)
+        elif self.output_format == "csv":
+            with open(self.output_file, "a", encoding="utf-8", newline="") as f:
+                writer = csv.DictWriter(f, COLUMNS, extrasaction="ignore", lineterminator="\n")
+                if self.header:
+                    writer.writeheader()
+                    self.header = False
+                writer.writerows(self.batch)
+        else:
+            with open(self.output_file, "a", encoding="utf-8") as f:
+                for record in self.batch:
+                    record = {column: record.get(column) for column in COLUMNS}
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.written += len(self.batch)
+        self.batch = []
+
+    def write_parquet(self, records):
+        """Appends a batch to the Parquet file as one or more row groups with the typed schema."""
+        import pyarrow.parquet as pq
+
+        table = records_to_arrow(records)
+        if self.parquet_writer is None:
+            compression = None if self.compression == "none" else self.compression
+            self.parquet_writer = pq.ParquetWriter(self.output_file, table.schema, compression=compression)
+        self.parquet_writer.write_table(table, row_group_size=self.row_group_size)
+
+    def close(self):
+        """Writes any remaining records and closes the output file, leaving a valid Parquet file even with no rows."""
+        self.flush()
+        if self.output_format == "parquet" and self.parquet_writer is None:
+            self.write_parquet([])
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+            self.parquet_writer = None
+
+
+class ProgressJournal:
+    """
+    A class used to record which URLs have been scraped in a SQLite database.
+
+    Finished URLs are looked up in the database a chunk at a time rather
+    than loaded into memory, so resuming costs the same however many
+    URLs the journal holds. Only outcomes recorded before the journal
+    was opened count as done, so duplicate rows of this run still get
+    their own result.
+
+    Attributes
+    ----------
+    path : str
+        Path to the SQLite journal file.
+    resume : bool
+        Keep the progress already recorded in the journal (default False).
+    skipped : int
+        Number of URLs left out by remaining as already done.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.pending = []
+        self.skipped = 0
+        self.opened = time.time()
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS progress ("
+            "url TEXT PRIMARY KEY, status TEXT NOT NULL, updated REAL NOT NULL)")
+        if not resume:
+            self.connection.execute("DELETE FROM progress")
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def count_done(self):
+        """Returns the number of URLs already scraped successfully."""
+        (count,) = self.connection.execute(
+            "SELECT COUNT(*) FROM progress WHERE status = 'done' AND updated < ?", (self.opened,)).fetchone()
+        return count
+
+    def completed(self, urls):
+        """Returns the set of URLs among urls already scraped successfully."""
+        done = set()
+        urls = list(urls)
+        for start in range(0, len(urls), 500):
+            chunk = urls[start:start + 500]
+            rows = self.connection.execute(
+                f"SELECT url FROM progress WHERE status = 'done' AND updated < ? "
+                f"AND url IN ({', '.join('?' * len(chunk))})", (self.opened, *chunk))
+            done.update(url for (url,) in rows)
+        return done
+
+    async def remaining(self, urls, chunksize=1000):
+        """Yields the URLs in urls (an iterable or async iterable) not already scraped, counting the others in skipped."""
+        chunk = []
+        async for url in _aiter(urls):
+            chunk.append(url)
+            if len(chunk) == chunksize:
+                for url in self.filter(chunk):
+                    yield url
+                chunk = []
+        for url in self.filter(chunk):
+            yield url
+
+    def filter(self, urls):
+        """Returns the URLs in a chunk that are not done yet."""
+        done = self.completed(urls)
+        self.skipped += sum(1 for url in urls if url in done)
+        return [url for url in urls if url not in done]
+
+    def mark(self, url, status):
+        """Records the outcome of a URL; it is saved on the next commit."""
+        self.pending.append((url, status, time.time()))
+
+    def commit(self):
+        """Saves the recorded outcomes to the journal."""
+        if self.pending:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO progress (url, status, updated) VALUES (?, ?, ?)",
+                self.pending)
+            self.connection.commit()
+            self.pending = []
+
+    def close(self):
+        """Saves any recorded outcomes and closes the journal."""
+        self.commit()
+        self.connection.close()
+
+
+INPUT_FORMATS = {".csv": "csv", ".txt": "txt", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet"}
+
+
+def _input_format(file_path, input_format=None):
+    """Returns input_format, or the format inferred from the file extension (text for stdin)."""
+    if input_format is None:
+        default = "txt" if file_path == "-" else "csv"
+        input_format = INPUT_FORMATS.get(os.path.splitext(str(file_path))[1].lower(), default)
+    return input_format
+
+
+def count_urls(file_path, input_format=None):
+    """
+    Returns the number of rows in an input file without parsing it, or None for stdin.
+
+    Text formats are counted by their newlines in large binary chunks,
+    so blank lines, rows without a URL and CSV fields spanning several
+    lines make it an upper bound.
+    """
+    if file_path == "-":
+        return None
+    input_format = _input_format(file_path, input_format)
+    if input_format == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(file_path).metadata.num_rows
+    lines = 0
+    last = b"\n"
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 ** 2), b""):
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+    lines += last != b"\n"
+    return max(0, lines - 1) if input_format == "csv" else lines
+
+
+def read_urls(file_path, input_format=None, chunksize=100000):
+    """
+    Lazily yields the URLs in an input file, without loading it into memory.
+
+    file_path may be "-" for stdin. input_format is one of "csv" (a url
+    column), "txt" (one URL per line), "jsonl" (objects with a url key,
+    or bare strings) or "parquet" (a url column); by default it is
+    inferred from the file extension, and stdin is read as text. Parquet
+    is read chunksize rows at a time, the other formats line by line,
+    skipping a UTF-8 byte order mark as written by e.g. Excel.
+    """
+    input_format = _input_format(file_path, input_format)
+    source = sys.stdin if file_path == "-" else file_path
+
+    if input_format == "csv":
+        f = sys.stdin if file_path == "-" else open(file_path, encoding="utf-8-sig", newline="")
+        try:
+            reader = csv.DictReader(f)
+            if "url" not in (reader.fieldnames or ()):
+                raise ValueError(f"{file_path} has no url column")
+            for row in reader:
+                url = (row["url"] or "").strip()
+                if url:
+                    yield url
+        finally:
+            if f is not sys.stdin:
+                f.close()
+    elif input_format == "parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize, columns=["url"]):
+            yield from (url for url in batch.column(0).to_pylist() if url)
+    elif input_format in ("txt", "jsonl"):
+        f = sys.stdin if file_path == "-" else open(file_path, encoding="utf-8-sig")
+        try:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if input_format == "jsonl":
+                    line = json.loads(line)
+                    line = line.get("url") if isinstance(line, dict) else line
+                if line:
+                    yield line
+        finally:
+            if f is not sys.stdin:
+                f.close()
+    else:
+        raise ValueError(f"Unknown input format {input_format!r}; expected one of {sorted(set(INPUT_FORMATS.values()))}")
+
+
+CREDENTIAL_FIELDS = frozenset({"api_key"})
+
+
+def normalize_url(url):
+    """Lowercases the scheme and host, drops default ports, fragments and credentials and sorts the query."""
+    parts = urlsplit(str(url).strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                             if name not in CREDENTIAL_FIELDS))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+class ResponseCache:
+    """
+    A class used to keep fetched responses on disk.
+
+    Response bodies are zlib-compressed and stored once per content hash
+    under directory, and a SQLite index maps each normalized URL (plus
+    any POSTed form data) to its body. Entries older than ttl are
+    ignored, and the least recently used ones are evicted once the
+    bodies take up more than max_size bytes.
+
+    The size of the bodies is summed once when the cache opens and kept
+    up to date by put and evict, so storing a response does not scan the
+    index. Access times of cache hits are written in batches of
+    ACCESS_BATCH rather than one transaction per hit.
+
+    Attributes
+    ----------
+    directory : str
+        Directory holding the index and the compressed bodies.
+    ttl : float
+        Seconds an entry stays fresh, None to keep entries forever (default None).
+    max_size : int
+        Maximum total size of the compressed bodies in bytes (default 10 GB).
+    size : int
+        Current total size of the compressed bodies in bytes.
+    """
+
+    ACCESS_BATCH = 1000
+
+    def __init__(self, directory, ttl=None, max_size=10 * 1024 ** 3):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size = max_size
+        self.accessed = {}
+        os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(directory, "index.sqlite"))
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, digest TEXT NOT NULL, size INTEGER NOT NULL, "
+            "stored REAL NOT NULL, accessed REAL NOT NULL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS responses_digest ON responses (digest)")
+        self.connection.commit()
+        self.size = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM responses)").fetchone()[0]
+
+    def close(self):
+        """Saves pending access times and closes the cache index."""
+        self.flush_accessed()
+        self.connection.close()
+
+    def flush_accessed(self):
+        """Writes the access times of recent cache hits to the index."""
+        if self.accessed:
+            self.connection.executemany(
+                "UPDATE responses SET accessed = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self.accessed.items()])
+            self.connection.commit()
+            self.accessed = {}
+
+    def referenced(self, digest):
+        """Returns True if any entry still points to the body with a given content hash."""
+        return self.connection.execute(
+            "SELECT 1 FROM responses WHERE digest = ? LIMIT 1", (digest,)).fetchone() is not None
+
+    def remove_body(self, digest, size):
+        """Deletes an unreferenced body and takes its size off the total."""
+        self.size -= size
+        try:
+            os.remove(self.body_path(digest))
+        except OSError:
+            pass
+
+    @staticmethod
+    def key(url, data=None):
+        """
+        Returns the cache key for a URL and its form data.
+
+        Credentials such as the NCBI api_key are left out, so they are
+        never written to the index and a changed or dropped key still
+        finds the same responses.
+        """
+        key = normalize_url(url)
+        data = sorted((name, value) for name, value in (data or {}).items() if name not in CREDENTIAL_FIELDS)
+        if data:
+            key += "\n" + urlencode(data)
+        return key
+
+    def body_path(self, digest):
+        """Returns the path of the compressed body with a given content hash."""
+        return os.path.join(self.directory, digest[:2], f"{digest}.z")
+
+    def get(self, url, data=None):
+        """Returns the cached body for a URL, or None if it is missing or stale."""
+        key = self.key(url, data)
+        row = self.connection.execute(
+            "SELECT digest, stored FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        digest, stored = row
+        now = time.time()
+        if self.ttl is not None and now - stored > self.ttl:
+            return None
+        try:
+            with open(self.body_path(digest), "rb") as f:
+                content = zlib.decompress(f.read())
+        except (OSError, zlib.error):
+            return None
+        self.accessed[key] = now
+        if len(self.accessed) >= self.ACCESS_BATCH:
+            self.flush_accessed()
+        return content
+
+    def put(self, url, content, data=None):
+        """Stores the body fetched for a URL and evicts old entries if the cache is full."""
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.body_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(zlib.compress(content))
+            os.replace(f"{path}.tmp", path)
+        key = self.key(url, data)
+        now = time.time()
+        size = os.path.getsize(path)
+        old = self.connection.execute("SELECT digest, size FROM responses WHERE key = ?", (key,)).fetchone()
+        new_body = not self.referenced(digest)
+        self.accessed.pop(key, None)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO responses (key, digest, size, stored, accessed) VALUES (?, ?, ?, ?, ?)",
+            (key, digest, size, now, now))
+        if new_body:
+            self.size += size
+        if old is not None and old[0] != digest and not self.referenced(old[0]):
+            self.remove_body(*old)
+        self.connection.commit()
+        if self.size > self.max_size:
+            self.evict()
+
+    def evict(self):
+        """Removes the least recently used entries until the bodies fit in max_size."""
+        self.flush_accessed()
+        while self.size > self.max_size:
+            rows = self.connection.execute(
+                "SELECT key, digest, size FROM responses ORDER BY accessed LIMIT 100").fetchall()
+            if not rows:
+                break
+            for key, digest, size in rows:
+                if self.size <= self.max_size:
+                    break
+                self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                if not self.referenced(digest):
+                    self.remove_body(digest, size)
+        self.connection.commit()
+
+
+class HtmlBackend:
+    """
+    A fetch backend that downloads and parses each article page.
+
+    Attributes
+    ----------
+    scraper : Scraper
+        The scraper whose session, rate limiter and parser are used.
+    """
+
+    batch_size = 1
+
+    def __init__(self, scraper):
+        self.scraper = scraper
+
+    async def scrape(self, urls):
+        """Scrapes a batch of URLs and returns one Article (or None) per URL."""
+        return [await self.scraper.scrape_data(url) for url in urls]
+
+
+class EFetchBackend:
+    """
+    A fetch backend that requests PubMed XML for many PMIDs per EFetch call.
+
+    The PMIDs are taken from the input URLs and the XML is mapped onto
+    the same columns the HTML backend produces.
+
+    Attributes
+    ----------
+    scraper : Scraper
+        The scraper whose session and rate limiter are used.
+    batch_size : int
+        Number of PMIDs requested per EFetch call (default 200).
+    api_key : str
+        NCBI API key sent with every request (default None).
+    eutils_url : str
+        Base URL of the E-utilities service (default EUTILS_URL).
+    """
+
+    def __init__(self, scraper, batch_size=200, api_key=None, eutils_url=EUTILS_URL):
+        self.scraper = scraper
+        self.batch_size = batch_size
+        self.api_key = api_key
+        self.eutils_url = eutils_url.rstrip("/")
+
+    async def scrape(self, urls):
+        """
+        Scrapes a batch of URLs with one EFetch call and returns one Article (or FetchError) per URL.
+
+        A response that is not well-formed XML fails the whole batch with
+        a FetchError; URLs without a PMID, or whose PMID is missing from
+        the response, get a FetchError of their own.
+        """
+        pmids = [extract_pmid(url, self.scraper.pubmed_url) for url in urls]
+        ids = sorted({pmid for pmid in pmids if pmid}, key=int)
+        articles = {}
+        if ids:
+            efetch_url = f"{self.eutils_url}/efetch.fcgi"
+            data = {"db": "pubmed", "retmode": "xml", "id": ",".join(ids)}
+            if self.api_key:
+                data["api_key"] = self.api_key
+            xml_content = await self.scraper.fetch_content(efetch_url, data)
+            start = time.perf_counter()
+            try:
+                articles = parse_pubmed_xml(xml_content)
+            except ET.ParseError as exc:
+                raise FetchError(efetch_url, f"ParseError: {exc}", 1) from exc
+            self.scraper.stats.record("parse", time.perf_counter() - start)
+        results = []
+        for url, pmid in zip(urls, pmids):
+            if pmid is None:
+                results.append(FetchError(url, "no PMID in URL", 0))
+            else:
+                results.append(articles.get(pmid) or FetchError(url, "not in the EFetch response", 1))
+        return results
+
+
+PARSER_ENGINES = ("html.parser", "lxml", "selectolax")
+
+
+def clean_text(text):
+    """Strips every line of an element's text and drops the blank ones."""
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+
+class SelectorStep:
+    """
+    One descendant step of a compiled ELEMENTS selector.
+
+    Attributes
+    ----------
+    selector : str
+        The compound selector for this step, e.g. "div#grants.grants".
+    compiled : soupsieve.SoupSieve
+        The step compiled for the BeautifulSoup engines by ExtractionPlan.compile.
+    children : list
+        The steps that follow this one in at least one field's selector.
+    union : soupsieve.SoupSieve
+        All children's selectors compiled as one list, so a step with
+        several children walks its subtree once (None with fewer than two).
+    fields : list
+        The fields whose selector ends at this step.
+    """
+
+    __slots__ = ("selector", "compiled", "children", "union", "fields")
+
+    def __init__(self, selector):
+        self.selector = selector
+        self.compiled = None
+        self.children = []
+        self.union = None
+        self.fields = []
+
+    def child(self, selector):
+        """Returns the child step for a selector, adding it if it is new."""
+        for step in self.children:
+            if step.selector == selector:
+                return step
+        step = SelectorStep(selector)
+        self.children.append(step)
+        return step
+
+
+class ExtractionPlan:
+    """
+    A field -> selector mapping compiled into a tree of SelectorSteps.
+
+    Each selector is split on its descendant combinators and the steps
+    are merged into a tree, so fields that share a prefix such as
+    "header#heading.heading div#full-view-heading.full-view" share its
+    nodes and the prefix is resolved once per document. Selectors are
+    compiled once, by compile, the first time a BeautifulSoup engine
+    uses the plan.
+
+    Attributes
+    ----------
+    elements : dict
+        The field -> selector mapping the plan was built from.
+    root : SelectorStep
+        The tree's root, standing for the whole document.
+    """
+
+    def __init__(self, elements):
+        self.elements = dict(elements)
+        self.root = SelectorStep(None)
+        for field, selector in self.elements.items():
+            step = self.root
+            for part in selector.split():
+                step = step.child(part)
+            step.fields.append(field)
+        self.compiled = False
+
+    def compile(self):
+        """Compiles every step's selector with soupsieve, once."""
+        if self.compiled:
+            return
+        import soupsieve
+
+        steps = [self.root]
+        while steps:
+            step = steps.pop()
+            if step.selector:
+                step.compiled = soupsieve.compile(step.selector)
+            if len(step.children) > 1:
+                step.union = soupsieve.compile(", ".join(child.selector for child in step.children))
+            steps.extend(step.children)
+        self.compiled = True
+
+
+EXTRACTION_PLAN = ExtractionPlan(ELEMENTS)
+
+
+def _join_texts(texts):
+    """Joins the cleaned texts of a field's matches, or returns None if there are none."""
+    return " ".join(clean_text(text) for text in texts) if texts else None
+
+
+class _Bs4Document:
+    """An article page parsed by BeautifulSoup with html.parser or lxml."""
+
+    def __init__(self, html_content, engine):
+        from bs4 import BeautifulSoup
+
+        self.root = BeautifulSoup(html_content, engine)
+
+    def extract(self, plan):
+        """Walks the plan's step tree, resolving each step inside its parent's matches."""
+        plan.compile()
+        texts = dict.fromkeys(plan.elements)
+        pending = [(plan.root, [self.root])]
+        while pending:
+            step, elements = pending.pop()
+            found = {id(child): [] for child in step.children}
+            for element in elements:
+                if step.union is None:
+                    for child in step.children:
+                        found[id(child)].extend(child.compiled.select(element))
+                    continue
+                for match in step.union.select(element):
+                    for child in step.children:
+                        if child.compiled.match(match):
+                            found[id(child)].append(match)
+            for child in step.children:
+                matches = found[id(child)]
+                if len(elements) > 1:
+                    seen = set()
+                    matches = [m for m in matches if not (id(m) in seen or seen.add(id(m)))]
+                if not matches:
+                    continue
+                if child.fields:
+                    text = _join_texts([match.text for match in matches])
+                    for field in child.fields:
+                        texts[field] = text
+                if child.children:
+                    pending.append((child, matches))
+        return texts
+
+
+class _SelectolaxDocument:
+    """An article page parsed by selectolax's lexbor parser."""
+
+    def __init__(self, html_content):
+        from selectolax.lexbor import LexborHTMLParser
+
+        self.root = LexborHTMLParser(html_content)
+
+    def extract(self, plan):
+        """Runs each field's full selector; lexbor matches them natively faster than a Python-level walk."""
+        return {field: _join_texts([node.text() for node in self.root.css(selector)])
+                for field, selector in plan.elements.items()}
+
+
+def parse_document(html_content, engine="html.parser"):
+    """Parses an article page with one of PARSER_ENGINES."""
+    if engine == "selectolax":
+        return _SelectolaxDocument(html_content)
+    if engine in PARSER_ENGINES:
+        return _Bs4Document(html_content, engine)
+    raise ValueError(f"Unknown parser engine {engine!r}; expected one of {PARSER_ENGINES}")
+
+
+def extract_fields(document, plan=EXTRACTION_PLAN):
+    """Extracts the plan's fields from a document returned by parse_document."""
+    return document.extract(plan)
+
+
+def parse_html(html_content, engine="html.parser"):
+    """
+    Extracts the ELEMENTS fields from an article page.
+
+    engine is one of PARSER_ENGINES. All engines return identical
+    values: the text of every matched element is passed through
+    clean_text and the matches are joined with a space. Fields are
+    pulled through EXTRACTION_PLAN, so shared selector prefixes are
+    only resolved once.
+    """
+    return Article(**extract_fields(parse_document(html_content, engine)))
+
+
+def _xml_text(element):
+    """Returns the stripped text of an XML element and its children."""
+    return "".join(element.itertext()).strip() if element is not None else ""
+
+
+def _join(values, sep=" "):
+    """Joins the non-empty values, or returns None if there are none."""
+    values = [value for value in values if value]
+    return sep.join(values) if values else None
+
+
+def parse_pubmed_xml(xml_content):
+    """Parses an EFetch PubmedArticleSet into a dictionary of Articles keyed by PMID."""
+    articles = {}
+    for article in ET.fromstring(xml_content).iter("PubmedArticle"):
+        citation = article.find("MedlineCitation")
+        details = citation.find("Article")
+        pmid = _xml_text(citation.find("PMID"))
+        ids = {i.get("IdType"): _xml_text(i) for i in article.iterfind("PubmedData/ArticleIdList/ArticleId")}
+        doi = ids.get("doi") or _xml_text(details.find("ELocationID[@EIdType='doi']"))
+
+        issue = details.find("Journal/JournalIssue")
+        date = " ".join(_xml_text(issue.find(f"PubDate/{part}")) for part in ("Year", "Month", "Day")).strip()
+        date = date or _xml_text(issue.find("PubDate/MedlineDate"))
+        volume = _xml_text(issue.find("Volume"))
+        number = _xml_text(issue.find("Issue"))
+        pages = _xml_text(details.find("Pagination/MedlinePgn"))
+        cit = date
+        if volume or number:
+            cit += f";{volume}" + (f"({number})" if number else "")
+        if pages:
+            cit += f":{pages}"
+
+        grants = []
+        for grant in details.iterfind("GrantList/Grant"):
+            parts = (_xml_text(grant.find(tag)) for tag in ("GrantID", "Acronym", "Agency", "Country"))
+            grants.append("/".join(part for part in parts if part))
+
+        authors = []
+        for author in details.iterfind("AuthorList/Author"):
+            name = " ".join(_xml_text(author.find(tag)) for tag in ("ForeName", "LastName")).strip()
+            authors.append(name or _xml_text(author.find("CollectiveName")))
+
+        abstracts = []
+        for text in details.iterfind("Abstract/AbstractText"):
+            label = text.get("Label")
+            abstracts.append(f"{label}: {_xml_text(text)}" if label else _xml_text(text))
+
+        articles[pmid] = Article(
+            title=_join([_xml_text(details.find("ArticleTitle"))]),
+            publication_type=_join([_xml_text(t) for t in details.iterfind("PublicationTypeList/PublicationType")], ", "),
+            journal=_join([_xml_text(details.find("Journal/ISOAbbreviation")) or _xml_text(details.find("Journal/Title"))]),
+            coi=_join([_xml_text(article.find("MedlineCitation/CoiStatement"))]),
+            grants=_join(grants, "\n"),
+            authors=_join(authors, ", "),
+            abstracts=_join(abstracts, "\n"),
+            pmid=pmid,
+            pmcid=_join([ids.get("pmc")]),
+            doi=_join([doi]),
+            citation=_join([f"{cit}." if cit else ""]),
+            erratum=_join([_xml_text(c.find("RefSource")) for c in citation.iterfind("CommentsCorrectionsList/CommentsCorrections[@RefType='ErratumIn']")]),
+        )
+    return articles
+
+
+def parse_search_date(value):
+    """Parses a YYYY, YYYY/MM or YYYY/MM/DD date (dashes also accepted) into a date."""
+    parts = [int(part) for part in str(value).replace("-", "/").split("/")]
+    return date(*(parts + [1] * (3 - len(parts))))
+
+
+class PubMedSearch:
+    """
+    A keyword search that streams the URLs of matching PubMed articles.
+
+    The query runs on ESearch with the history server (usehistory=y) and
+    the matching PMIDs are paged out of it with EFetch using the returned
+    WebEnv and query_key. PubMed only hands out the first 9,999 records
+    of a search, so a date range with more matches is split in half
+    until every window fits.
+
+    Attributes
+    ----------
+    scraper : Scraper
+        The scraper whose session, rate limiter and retry policy are used.
+    query : str
+        The PubMed search term.
+    mindate : str
+        Start of the date range as YYYY[/MM[/DD]] (default 1800).
+    maxdate : str
+        End of the date range as YYYY[/MM[/DD]] (default today).
+    datetype : str
+        Date searched: "pdat" (publication), "edat" (Entrez) or "mdat" (modification) (default "pdat").
+    page_size : int
+        Number of PMIDs fetched per EFetch page (default 5000).
+    pubmed_url : str
+        Base URL the article URLs are built on (default PUBMED_URL).
+    """
+
+    LIMIT = 9999
+
+    def __init__(self, scraper, query, mindate=None, maxdate=None, datetype="pdat",
+                 page_size=5000, pubmed_url=PUBMED_URL):
+        self.scraper = scraper
+        self.query = query
+        self.mindate = parse_search_date(mindate or "1800")
+        self.maxdate = parse_search_date(maxdate) if maxdate else date.today()
+        self.datetype = datetype
+        self.page_size = min(page_size, self.LIMIT)
+        self.pubmed_url = pubmed_url.rstrip("/")
+
+    async def eutils(self, tool, data):
+        """Sends an E-utilities request, bypassing the response cache, and returns the body."""
+        data = {"db": "pubmed", **data}
+        if self.scraper.api_key:
+            data["api_key"] = self.scraper.api_key
+        return await self.scraper.fetch_content(f"{self.scraper.eutils_url}/{tool}.fcgi", data, use_cache=False)
+
+    async def esearch(self, mindate, maxdate):
+        """Runs the query over a date window on the history server and returns (count, webenv, query_key)."""
+        content = await self.eutils("esearch", {
+            "term": self.query, "datetype": self.datetype, "usehistory": "y", "retmax": "0",
+            "mindate": mindate.strftime("%Y/%m/%d"), "maxdate": maxdate.strftime("%Y/%m/%d"),
+        })
+        root = ET.fromstring(content)
+        if root.find("ERROR") is not None:
+            raise ValueError(f"ESearch failed for {self.query!r}: {_xml_text(root.find('ERROR'))}")
+        return int(root.findtext("Count", "0")), root.findtext("WebEnv"), root.findtext("QueryKey")
+
+    async def windows(self):
+        """Yields (count, webenv, query_key) for consecutive date windows of at most LIMIT matches each."""
+        stack = [(self.mindate, self.maxdate)]
+        while stack:
+            start, end = stack.pop()
+            count, webenv, query_key = await self.esearch(start, end)
+            if self.scraper.total is None:
+                self.scraper.total = count
+            if count > self.LIMIT and start < end:
+                middle = start + (end - start) // 2
+                stack.append((middle + timedelta(days=1), end))
+                stack.append((start, middle))
+                continue
+            if count > self.LIMIT:
+                print(f"{count} articles match on {start}; only the first {self.LIMIT} can be retrieved")
+            if count:
+                yield min(count, self.LIMIT), webenv, query_key
+
+    async def pmids(self):
+        """Yields the PMIDs of every matching article."""
+        async for count, webenv, query_key in self.windows():
+            for retstart in range(0, count, self.page_size):
+                content = await self.eutils("efetch", {
+                    "WebEnv": webenv, "query_key": query_key, "rettype": "uilist", "retmode": "text",
+                    "retstart": str(retstart), "retmax": str(min(self.page_size, count - retstart)),
+                })
+                for pmid in content.decode().split():
+                    yield pmid
+
+    async def urls(self):
+        """Yields the article URL of every matching article."""
+        async for pmid in self.pmids():
+            yield f"{self.pubmed_url}/{pmid}/"
+
+
+class _ThreadedIterator:
+    """
+    Advances a blocking iterator in a daemon thread and hands its items to the event loop.
+
+    Used for iterators such as read_urls, whose reads of a file or of a
+    slow stdin would otherwise stall every request in flight. The thread
+    waits once maxsize items are buffered, and the loop is only woken
+    while the consumer is waiting for more.
+
+    Attributes
+    ----------
+    iterable : iterable
+        The blocking iterable to read.
+    maxsize : int
+        Maximum number of items buffered ahead of the consumer.
+    batch_size : int
+        Number of items handed over at a time while the consumer is busy.
+    """
+
+    def __init__(self, iterable, maxsize=10000, batch_size=1000):
+        self.iterable = iterable
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.items = deque()
+        self.lock = threading.Condition()
+        self.waiter = None
+        self.waiting = False
+        self.finished = False
+        self.stopped = False
+        self.error = None
+        self.loop = None
+
+    def wake(self):
+        """Resolves the consumer's waiter, on the event loop."""
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    def notify(self):
+        """Wakes the consumer from the reading thread."""
+        try:
+            self.loop.call_soon_threadsafe(self.wake)
+        except RuntimeError:
+            pass  # the loop is already closed
+
+    def put(self, batch):
+        """Moves a batch of items into the buffer, waiting while it is full; returns False once stopped."""
+        with self.lock:
+            while len(self.items) >= self.maxsize and not self.stopped:
+                self.lock.wait()
+            if self.stopped:
+                return False
+            self.items.extend(batch)
+            waiting = self.waiting
+            self.waiting = False
+        batch.clear()
+        if waiting:
+            self.notify()
+        return True
+
+    def read(self):
+        """Reads the iterable into the buffer until it is exhausted or the consumer stops."""
+        batch = []
+        try:
+            for item in self.iterable:
+                batch.append(item)
+                # Hand items over one by one only while the consumer is idle.
+                if (len(batch) >= self.batch_size or self.waiting) and not self.put(batch):
+                    return
+        except Exception as exc:
+            self.error = exc
+        finally:
+            self.put(batch)
+            if self.stopped and hasattr(self.iterable, "close"):
+                self.iterable.close()
+            with self.lock:
+                self.finished = True
+            self.notify()
+
+    async def __aiter__(self):
+        self.loop = asyncio.get_running_loop()
+        threading.Thread(target=self.read, name="read_urls", daemon=True).start()
+        try:
+            while True:
+                with self.lock:
+                    batch = list(self.items)
+                    self.items.clear()
+                    self.lock.notify()
+                    if not batch:
+                        if self.finished:
+                            break
+                        self.waiter = self.loop.create_future()
+                        self.waiting = True
+                if batch:
+                    for item in batch:
+                        yield item
+                else:
+                    await self.waiter
+                    self.waiter = None
+            if self.error is not None:
+                raise self.error
+        finally:
+            with self.lock:
+                self.stopped = True
+                self.lock.notify()
+
+
+async def _aiter(iterable):
+    """
+    Iterates over an iterable or an async iterable asynchronously.
+
+    Collections are iterated in place; any other iterator may block on
+    I/O, so it is read in a thread by _ThreadedIterator.
+    """
+    if hasattr(iterable, "__aiter__"):
+        async for item in iterable:
+            yield item
+    elif isinstance(iterable, Collection):
+        for item in iterable:
+            yield item
+    else:
+        async for item in _ThreadedIterator(iterable):
+            yield item
 
-nest_asyncio.apply()
 
 class Scraper:
     """
@@ -62,73 +1976,521 @@ class Scraper:
     Attributes
     ----------
     file_path : str
-        Path to the CSV file containing URLs.
-    delay : int
-        Delay between requests in seconds (default 1).
+        Path to the file containing URLs, or "-" for stdin.
+    delay : float
+        Delay between requests in seconds; overrides rate with 1 / delay when given (default None).
     max_requests : int
-        Maximum number of concurrent requests (default 5).
+        Maximum number of concurrent requests, or the starting number when adaptive (default 5).
+    limit_per_host : int
+        Maximum number of pooled connections to a single host (default max_requests).
+    keepalive_timeout : float
+        Seconds an idle pooled connection is kept open (default 30).
+    dns_cache_ttl : int
+        Seconds a resolved host address is cached (default 300).
+    rate : float
+        Maximum number of requests started per second, None for no limit (default 3).
+    burst : int
+        Number of requests that may start back to back before rate applies (default 1).
+    backend : str
+        Fetch backend, "html" for article pages or "efetch" for E-utilities XML (default "html").
+    api_key : str
+        NCBI API key sent with E-utilities requests (default None).
+    eutils_url : str
+        Base URL of the E-utilities service (default EUTILS_URL).
+    efetch_batch_size : int
+        Number of PMIDs requested per EFetch call (default 200).
+    parser_engine : str
+        HTML parser used by the html backend, one of PARSER_ENGINES (default "html.parser").
+    parse_workers : int
+        Number of processes parsing article pages, 0 to parse on the event loop (default os.cpu_count()).
+    cache_dir : str
+        Directory of the on-disk response cache, None to disable it (default None).
+    cache_ttl : float
+        Seconds a cached response stays fresh, None to keep it forever (default None).
+    cache_max_size : int
+        Maximum size of the cached bodies in bytes (default 10 GB).
+    cache_only : bool
+        Serve every response from the cache and never touch the network (default False).
+    refresh : bool
+        Ignore cached responses but store the fresh ones (default False).
+    retry_policy : RetryPolicy
+        When and how often failed fetches are retried (default RetryPolicy()).
+    dead_letter_file : str
+        JSONL file to which URLs that could not be fetched are appended, None to skip it; scrape_to_file
+        empties it first unless resuming (default None).
+    adaptive : bool
+        Adjust the number of concurrent requests with AdaptiveConcurrency (default False).
+    adaptive_min : int
+        Lower bound on concurrent requests when adaptive (default 1).
+    adaptive_max : int
+        Upper bound on concurrent requests when adaptive (default 50).
+    input_format : str
+        Format of the input file for iter_urls, see read_urls (default inferred from the extension).
+    chunksize : int
+        Number of rows read at a time from Parquet input by iter_urls (default 100000).
+    dedupe : bool
+        Fetch PubMed URLs in canonical form and answer duplicate rows of a PMID in flight or
+        within dedupe_window from its result; older duplicates are fetched again (default True).
+    dedupe_window : int
+        Number of recent results kept to answer duplicates that arrive after their PMID finished (default 10000).
+    pubmed_url : str
+        Base URL of PubMed article pages, e.g. a mirror; see extract_pmid (default PUBMED_URL).
+    workers : int
+        Number of workers pulling URLs from the queue (default max_requests, or adaptive_max when adaptive).
+    queue_size : int
+        Maximum number of URLs and results waiting in the queues (default 2 * workers).
+    progress : str
+        Live progress shown by scrape_to_file, see Progress: "auto", "bar", "log" or "none" (default "none").
+    progress_interval : float
+        Seconds between progress log lines when not on a terminal (default 10).
+    total : int
+        Number of URLs expected, for the progress ETA, None if unknown; set by PubMedSearch
+        from the match count of its query (default None).
+    metrics_port : int
+        Port of the Prometheus endpoint served by MetricsServer, None to disable it (default None).
+    metrics_host : str
+        Address the Prometheus endpoint listens on (default "127.0.0.1").
+    stats : RunStats
+        Per-phase timings, bytes and request counts of the run.
     """
 
-    def __init__(self, file_path, delay=1, max_requests=5):
+    def __init__(self, file_path, delay=None, max_requests=5, limit_per_host=None,
+                 keepalive_timeout=30, dns_cache_ttl=300, rate=3, burst=1,
+                 workers=None, queue_size=None, backend="html", api_key=None,
+                 eutils_url=None, efetch_batch_size=200, parser_engine="html.parser",
+                 parse_workers=None, cache_dir=None, cache_ttl=None,
+                 cache_max_size=10 * 1024 ** 3, cache_only=False, refresh=False,
+                 retry_policy=None, dead_letter_file=None, adaptive=False,
+                 adaptive_min=1, adaptive_max=50, input_format=None, chunksize=100000,
+                 dedupe=True, dedupe_window=10000, progress="none", progress_interval=10,
+                 total=None, metrics_port=None, metrics_host="127.0.0.1", pubmed_url=PUBMED_URL):
         self.file_path = file_path
+        self.pubmed_url = pubmed_url.rstrip("/")
+        self.input_format = input_format
+        self.chunksize = chunksize
+        self.dedupe = dedupe
+        self.dedupe_window = dedupe_window
         self.df = None
-        self.start_time = datetime.now()
+        self.scraped = 0
+        self.failed = 0
+        self.skipped = 0
+        self.preview = []
         self.delay = delay
-        self.semaphore = asyncio.Semaphore(max_requests)
+        self.max_requests = max_requests
+        self.pool_size = adaptive_max if adaptive else max_requests
+        self.limit_per_host = limit_per_host or self.pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.workers = workers or self.pool_size
+        self.queue_size = queue_size or 2 * self.workers
+        if delay is not None:
+            rate = 1 / delay if delay > 0 else None
+        if parser_engine not in PARSER_ENGINES:
+            raise ValueError(f"Unknown parser engine {parser_engine!r}; expected one of {PARSER_ENGINES}")
+        self.parser_engine = parser_engine
+        self.parse_workers = os.cpu_count() if parse_workers is None else parse_workers
+        self.executor = None
+        self.api_key = api_key
+        self.eutils_url = (eutils_url or EUTILS_URL).rstrip("/")
+        if backend == "efetch":
+            self.backend = EFetchBackend(self, efetch_batch_size, api_key, self.eutils_url)
+        else:
+            self.backend = HtmlBackend(self)
+        if cache_only and cache_dir is None:
+            raise ValueError("cache_only needs a cache_dir")
+        self.cache = ResponseCache(cache_dir, cache_ttl, cache_max_size) if cache_dir else None
+        self.cache_only = cache_only
+        self.refresh = refresh
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.dead_letter_file = dead_letter_file
+        self.retries = 0
+        self.refetched = 0
+        self.controller = AdaptiveConcurrency(max_requests, adaptive_min, adaptive_max) if adaptive else None
+        self.semaphore = self.controller or asyncio.Semaphore(max_requests)
+        self.limiter = RateLimiter(rate, burst)
+        self.session = None
+        self.stats = RunStats()
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.total = total
+        self.in_flight = 0
+        self.queues = {}
+        self.metrics = MetricsServer(self, metrics_host, metrics_port) if metrics_port is not None else None
+
+    async def __aenter__(self):
+        self.stats.reset()
+        if self.metrics is not None:
+            await self.metrics.start()
+        await self.open_session()
+        if self.parse_workers and self.executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+
+            self.executor = ProcessPoolExecutor(self.parse_workers)
+            # Start the workers now: forked later, they could inherit a lock
+            # (such as stdin's) held by the thread that reads the input.
+            await asyncio.get_running_loop().run_in_executor(self.executor, int)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close_session()
+        if self.metrics is not None:
+            await self.metrics.close()
+        if self.cache is not None:
+            self.cache.close()
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    async def open_session(self):
+        """Opens the pooled HTTP session shared by every fetch."""
+        if self.session is None:
+            import aiohttp
+
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+            )
+            self.session = aiohttp.ClientSession(connector=connector, trace_configs=[self.trace_config()])
+
+    def trace_config(self):
+        """Returns an aiohttp TraceConfig that times new connections into each request's trace context."""
+        import aiohttp
+
+        trace = aiohttp.TraceConfig()
+
+        async def on_connection_create_start(session, context, params):
+            context.connect_started = time.perf_counter()
+
+        async def on_connection_create_end(session, context, params):
+            if context.trace_request_ctx is not None:
+                context.trace_request_ctx["connect"] = time.perf_counter() - context.connect_started
+
+        trace.on_connection_create_start.append(on_connection_create_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        return trace
+
+    async def close_session(self):
+        """Closes the pooled HTTP session and its connections."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
 
     def load_data(self):
         """Loads the URLs from the CSV file into a pandas DataFrame."""
+        import pandas as pd
+
         self.df = pd.read_csv(self.file_path)
         self.df = self.df[["url"]]
 
+    def iter_urls(self):
+        """Lazily yields the URLs from the input file in chunks, without loading it into memory."""
+        return read_urls(self.file_path, self.input_format, self.chunksize)
+
+    async def fetch_content(self, url, data=None, use_cache=True):
+        """
+        Fetches the raw bytes of a given URL, POSTing data when it is given.
+
+        A rate-limit token is taken before the concurrency slot, so a
+        slot is only held while its request is actually running.
+        Transient failures are retried according to retry_policy, outside
+        the concurrency slot; a FetchError is raised once the URL has
+        failed permanently or used up its attempts. With a cache, fresh
+        cached responses are returned without a request unless refresh
+        is set, and successful responses are stored. With cache_only, a
+        cache miss raises a FetchError. use_cache=False skips the cache,
+        for responses such as search results that must not be replayed.
+        The session is opened on the first request if the scraper is not
+        used as `async with Scraper(...)`.
+        """
+        cache = self.cache if use_cache else None
+        if cache is not None and not self.refresh:
+            content = cache.get(url, data)
+            if content is not None:
+                self.stats.cache_hits += 1
+                return content
+        if self.cache_only and use_cache:
+            raise FetchError(url, "not in cache", 0)
+        import aiohttp
+
+        method = "GET" if data is None else "POST"
+        if self.session is None:
+            await self.open_session()
+        for attempt in range(1, self.retry_policy.max_attempts + 1):
+            retry_after = None
+            waited = time.perf_counter()
+            await self.limiter.acquire()
+            acquired = time.perf_counter()
+            async with self.semaphore:
+                start = time.perf_counter()
+                self.stats.record("rate_limit", acquired - waited)
+                self.stats.record("semaphore", start - acquired)
+                self.stats.requests += 1
+                timing = {}
+                try:
+                    async with self.session.request(method, url, data=data, trace_request_ctx=timing) as response:
+                        headers = time.perf_counter()
+                        connect = timing.get("connect", 0.0)
+                        if "connect" in timing:
+                            self.stats.record("connect", connect)
+                        self.stats.record("ttfb", headers - start - connect)
+                        self.stats.status(response.status)
+                        if 200 <= response.status < 300:
+                            content = await response.read()
+                            finished = time.perf_counter()
+                            self.stats.record("download", finished - headers)
+                            self.stats.record("fetch", finished - start)
+                            self.stats.bytes += len(content)
+                            if self.controller is not None:
+                                self.controller.record(finished - start)
+                            if cache is not None:
+                                cache.put(url, content, data)
+                            return content
+                        reason = f"HTTP {response.status}"
+                        transient = self.retry_policy.is_transient(status=response.status)
+                        retry_after = response.headers.get("Retry-After")
+                        self.stats.record("fetch", time.perf_counter() - start)
+                        if self.controller is not None:
+                            self.controller.record(overloaded=response.status in (429, 503))
+                except (asyncio.TimeoutError, aiohttp.ClientError) as exc:
+                    reason = f"{type(exc).__name__}: {exc}"
+                    transient = self.retry_policy.is_transient(exc=exc)
+                    self.stats.status("error")
+                    self.stats.record("fetch", time.perf_counter() - start)
+                    if self.controller is not None:
+                        self.controller.record(overloaded=transient)
+            if not transient or attempt == self.retry_policy.max_attempts:
+                raise FetchError(url, reason, attempt)
+            self.retries += 1
+            await asyncio.sleep(self.retry_policy.backoff(attempt, retry_after))
+
     async def get_html_content(self, url):
-        """Fetches the HTML content of a given URL."""
-        async with self.semaphore:
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url) as response:
-                        await asyncio.sleep(self.delay)
-                        return await response.text()
-            except asyncio.TimeoutError:
-                print(f"TimeoutError occurred while fetching {url}")
-                return None
+        """Fetches the raw HTML content of a given URL."""
+        return await self.fetch_content(url)
 
     async def scrape_data(self, url):
-        """Scrapes the data from a given URL and returns a dictionary of the scraped data."""
+        """Scrapes the data from a given URL and returns it as an Article."""
         html_content = await self.get_html_content(url)
         if html_content is None:
             return None
-        soup = BeautifulSoup(html_content, "html.parser")
-
-        elements = {
-            "title": "header#heading.heading div#full-view-heading.full-view h1.heading-title",
-            "publication_type": "header#heading.heading div#short-view-heading.short-view div.publication-type",
-            "journal": "header#heading.heading div#full-view-heading.full-view div.article-citation div.article-source div.journal-actions.dropdown-block button#full-view-journal-trigger.journal-actions-trigger.trigger",
-            "coi": "div#conflict-of-interest.conflict-of-interest div.statement p",
-            "grants": "div#grants.grants",
-            "authors": "header#heading.heading div#full-view-heading.full-view div.inline-authors div.authors div.authors-list",
-            "abstracts": "div#abstract.abstract div#eng-abstract.abstract-content.selected",
-            "pmid": "header#heading.heading div#full-view-heading.full-view ul#full-view-identifiers.identifiers li span.identifier.pubmed strong.current-id",
-            "pmcid": "header#heading.heading div#full-view-heading.full-view ul#full-view-identifiers.identifiers li span.identifier.pmc a.id-link",
-            "doi": "header#heading.heading div#full-view-heading.full-view ul#full-view-identifiers.identifiers li span.identifier.doi a.id-link",
-            "citation": "header#heading.heading div#full-view-heading.full-view div.article-citation div.article-source span.cit",
-            "erratum": "main#article-details.article-details div#linked-correction-forward.linked-articles",
-        }
+        start = time.perf_counter()
+        if self.executor is None:
+            data = parse_html(html_content, self.parser_engine)
+        else:
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(self.executor, parse_html, html_content, self.parser_engine)
+        self.stats.record("parse", time.perf_counter() - start)
+        return data
 
-        texts = {}
-        for key, value in elements.items():
-            element = soup.select(value)
-            texts[key] = " ".join(e.text.strip() for e in element) if element else pd.NA
+    async def scrape_iter(self, urls):
+        """
+        Scrapes an iterable or async iterable of URLs with a bounded pool of workers.
 
-        return texts
+        Yields (index, url, data) tuples in completion order. URLs are
+        handed to the backend in batches of its batch_size. At most
+        queue_size batches and queue_size results are held at any time,
+        so memory does not grow with the number of URLs.
+
+        With dedupe, every PubMed URL is fetched in its canonical_url
+        form, and a later row for a PMID that is still in flight, or
+        among the last dedupe_window results, is yielded with that
+        result under its own URL instead of being fetched. The dedupe is
+        window-based: older duplicates are fetched again, and a PmidSet of
+        every PMID seen only counts them in refetched; the response cache
+        makes the fetch cheap. URLs that are not PubMed articles, or whose
+        number is above PmidSet.MAX_PMID, are fetched as given. Every row
+        yielded is counted in scraped or failed.
+
+        Outside `async with Scraper(...)`, a session is opened for the
+        scrape and closed when it ends.
+        """
+        owns_session = self.session is None
+        pending = asyncio.Queue(maxsize=self.queue_size)
+        finished = asyncio.Queue(maxsize=self.queue_size)
+        self.queues = {"pending": pending, "finished": finished}
+
+        batch_size = self.backend.batch_size
+        seen = PmidSet()
+        in_flight = {}
+        recent = OrderedDict()
+
+        def dedupe(item):
+            """Returns (pmid, fetch_url) for an item, or (pmid, None) if it waits on an earlier row."""
+            index, url = item
+            pmid = extract_pmid(url, self.pubmed_url)
+            if not self.dedupe or pmid is None or int(pmid) > PmidSet.MAX_PMID:
+                return None, url
+            pmid = int(pmid)
+            if pmid in in_flight:
+                in_flight[pmid].append(item)
+                return pmid, None
+            if pmid in recent:
+                recent.move_to_end(pmid)
+                return pmid, None
+            if pmid in seen:
+                self.refetched += 1
+            seen.add(pmid)
+            in_flight[pmid] = []
+            return pmid, canonical_url(url, self.pubmed_url)
+
+        async def produce():
+            try:
+                batch = []
+                index = 0
+                async for url in _aiter(urls):
+                    item = (index, url)
+                    index += 1
+                    pmid, fetch_url = dedupe(item)
+                    if fetch_url is None:
+                        if pmid in recent:
+                            self.scraped += 1
+                            await finished.put((*item, recent[pmid]))
+                        continue
+                    batch.append((*item, pmid, fetch_url))
+                    if len(batch) == batch_size:
+                        await pending.put((time.perf_counter(), batch))
+                        batch = []
+                if batch:
+                    await pending.put((time.perf_counter(), batch))
+            except Exception as exc:
+                await finished.put(exc)
+                return
+            for _ in range(self.workers):
+                await pending.put(None)
+
+        async def work():
+            try:
+                while True:
+                    item = await pending.get()
+                    if item is None:
+                        break
+                    queued, batch = item
+                    self.stats.record("queue", time.perf_counter() - queued)
+                    self.in_flight += len(batch)
+                    try:
+                        results = await self.backend.scrape([fetch_url for *_, fetch_url in batch])
+                    except FetchError as exc:
+                        results = [exc] * len(batch)
+                    self.in_flight -= len(batch)
+                    reported = None
+                    for (index, url, pmid, _), data in zip(batch, results):
+                        aliases = in_flight.pop(pmid, ()) if pmid is not None else ()
+                        if isinstance(data, FetchError):
+                            if data is not reported:
+                                print(data)
+                                reported = data
+                            for failed_url in (url, *(alias_url for _, alias_url in aliases)):
+                                self.record_failure(failed_url, data)
+                            data = None
+                        if data is None:
+                            self.failed += 1 + len(aliases)
+                        else:
+                            self.scraped += 1 + len(aliases)
+                        await finished.put((index, url, data))
+                        if data is not None and pmid is not None:
+                            recent[pmid] = data
+                            if len(recent) > self.dedupe_window:
+                                recent.popitem(last=False)
+                        for alias in aliases:
+                            await finished.put((*alias, data))
+            except Exception as exc:
+                await finished.put(exc)
+            else:
+                await finished.put(None)
+
+        tasks = [asyncio.ensure_future(produce())]
+        tasks += [asyncio.ensure_future(work()) for _ in range(self.workers)]
+        try:
+            running = self.workers
+            while running:
+                item = await finished.get()
+                if item is None:
+                    running -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if owns_session:
+                await self.close_session()
+
+    def record_failure(self, url, error):
+        """Appends a URL that could not be fetched to the dead-letter file."""
+        if self.dead_letter_file is None:
+            return
+        entry = {"url": url, "reason": error.reason, "attempts": error.attempts,
+                 "time": datetime.now().isoformat(timespec="seconds")}
+        with open(self.dead_letter_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
 
     async def scrape_all(self):
         """Scrapes the data from all URLs in the DataFrame."""
-        tasks = [self.scrape_data(url) for url in self.df["url"]]
-        results = await asyncio.gather(*tasks)
-        scraped_df = pd.DataFrame(results)
+        import pandas as pd
+
+        results = [None] * len(self.df)
+        async for index, url, data in self.scrape_iter(self.df["url"]):
+            results[index] = data
+        columns = article_columns(results)
+        scraped_df = pd.DataFrame({field: columns[field] for field in ELEMENTS})
         self.df = pd.concat([self.df, scraped_df], axis=1)
 
+    async def scrape_to_file(self, output_file, batch_size=1000, output_format=None,
+                             journal_file=None, resume=False, urls=None,
+                             compression="zstd", row_group_size=None, count=None):
+        """
+        Scrapes the data from all URLs in the DataFrame, or from urls
+        (an iterable or async iterable) when given, and writes it to a file.
+
+        Records are written in batches of batch_size as they finish, so a
+        crash loses at most one batch and memory does not grow with the run.
+        Each URL's outcome is committed to the journal together with the
+        batch that holds it; with resume, URLs the journal lists as done
+        are skipped and failed ones are tried again, and otherwise the
+        output and dead-letter files start out empty. A Parquet file cannot
+        be read before its footer is written on close, so for Parquet
+        output the journal is only committed once the file is closed.
+        count, e.g. a partial of count_urls, is run in a thread for the
+        progress ETA when total is not known, so scraping starts at once.
+        """
+        journal_file = journal_file or f"{output_file}.journal"
+        with ProgressJournal(journal_file, resume) as journal, \
+                ResultWriter(output_file, batch_size, output_format, append=resume,
+                             compression=compression, row_group_size=row_group_size) as writer:
+            if not resume and self.dead_letter_file is not None:
+                open(self.dead_letter_file, "w").close()
+            urls = self.df["url"] if urls is None else urls
+            total = self.total
+            if total is None and self.df is not None:
+                total = len(self.df)
+            done = 0
+            if resume:
+                urls = journal.remaining(urls)
+                done = journal.count_done()
+                if total is not None:
+                    total = max(0, total - done)
+            crash_safe = writer.output_format != "parquet"
+            async with Progress(self, total, self.progress, self.progress_interval, count=count, skip=done):
+                async for index, url, data in self.scrape_iter(urls):
+                    if data is None:
+                        journal.mark(url, "failed")
+                        continue
+                    record = data.with_url(url)
+                    journal.mark(url, "done")
+                    written = writer.written
+                    start = time.perf_counter()
+                    writer.write(record)
+                    self.stats.record("write", time.perf_counter() - start)
+                    if crash_safe and writer.written != written:
+                        journal.commit()
+                    if len(self.preview) < 5:
+                        self.preview.append(record)
+            self.skipped = journal.skipped
+        print(f"Results saved to {output_file}")
+
     def format_time(self, elapsed_time):
         """Formats the elapsed time into a readable string."""
         if elapsed_time < 60:
@@ -140,49 +2502,327 @@ class Scraper:
 
     def print_results(self):
         """Prints the results of the scraping process."""
-        elapsed_time = (datetime.now() - self.start_time).total_seconds()
-        formatted_time = self.format_time(elapsed_time)
-        print(f"It took {formatted_time} to find {len(self.df)} articles")
-        print('Preview of scraped data:\n', self.df.head(5))
+        report = self.report()
+        formatted_time = self.format_time(report["elapsed"])
+        print(f"It took {formatted_time} to find {self.scraped} articles")
+        if self.failed or self.skipped:
+            print(f"{self.failed} URLs failed and {self.skipped} were skipped as already scraped")
+        if self.retries:
+            print(f"{self.retries} requests were retried")
+        if self.refetched:
+            print(f"{self.refetched} duplicate PMIDs were fetched again after leaving the dedupe window; "
+                  "raise --dedupe_window or use --cache_dir to avoid it")
+        if self.controller is not None:
+            print(f"Final concurrency limit: {self.controller.limit}")
+        print(f"{report['requests']} requests downloaded {report['bytes'] / 1024 ** 2:.1f} MB "
+              f"({report['cache_hits']} cache hits) at {report['pages_per_sec'] or 0:.1f} pages/sec")
+        if report["phases"]:
+            print(self.stats.format_report(report))
+        if self.preview:
+            print('Preview of scraped data:')
+            for record in self.preview:
+                print(f"  {record.get('pmid') or record['url']:<12} {(record.get('title') or '')[:100]}")
+        elif self.df is not None:
+            print('Preview of scraped data:\n', self.df.head(5))
         return self.df
 
+    def report(self):
+        """Returns the run report of stats with the scrape counts, see RunStats.report."""
+        return self.stats.report(scraped=self.scraped, failed=self.failed, skipped=self.skipped,
+                                 retries=self.retries, refetched=self.refetched,
+                                 concurrency=self.controller.limit if self.controller else self.max_requests)
+
+    def save_report(self, report_file):
+        """Writes the run report to a JSON file so that runs can be compared."""
+        with open(report_file, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+        print(f"Run report saved to {report_file}")
+
     def save_results(self, output_file):
         """Saves the results to a CSV file."""
         self.df.to_csv(output_file, index=False)
         print(f"Results saved to {output_file}")
 
 
-async def main(file_path, delay, max_requests, output_file):
+async def scrape(urls, **options):
+    """
+    Scrapes urls (an iterable or async iterable) and yields a record for each scraped URL.
+
+    Records are Articles carrying the url and the ELEMENTS fields, yielded
+    in completion order; URLs that fail are left out and, with a
+    dead_letter_file, written there. options are passed to Scraper. This
+    runs on whatever event loop awaits it, so it can be used from
+    servers and, with top-level await, from notebooks:
+
+        async for record in scrape(urls, rate=10, api_key=key):
+            ...
+    """
+    async with Scraper(None, **options) as scraper:
+        async for index, url, data in scraper.scrape_iter(urls):
+            if data is not None:
+                yield data.with_url(url)
+
+
+def scrape_sync(urls, **options):
+    """
+    Scrapes urls from synchronous code and returns the list of records, see scrape.
+
+    Runs its own event loop with asyncio.run, or in a separate thread
+    when called from code that is already running a loop (such as a
+    notebook cell), so the caller's loop is never patched or blocked
+    from the inside.
+    """
+    async def collect():
+        return [record async for record in scrape(urls, **options)]
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(collect())
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(1) as executor:
+        return executor.submit(asyncio.run, collect()).result()
+
+
+EVENT_LOOPS = ("asyncio", "uvloop")
+
+
+def install_event_loop(name="asyncio"):
+    """Installs the event loop implementation the CLI runs on and returns the name of the one in use."""
+    if name not in EVENT_LOOPS:
+        raise ValueError(f"Unknown event loop {name!r}; expected one of {EVENT_LOOPS}")
+    if name == "uvloop":
+        try:
+            import uvloop
+        except ImportError:
+            print("uvloop is not installed; falling back to the default asyncio event loop")
+            return "asyncio"
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return name
+
+
+async def main(file_path, delay, max_requests, output_file, batch_size=1000,
+               output_format=None, journal_file=None, resume=False, query=None,
+               mindate=None, maxdate=None, datetype="pdat", pubmed_url=PUBMED_URL,
+               compression="zstd", row_group_size=None, report_file=None, **options):
     """Main function to run the scraper."""
-    scraper = Scraper(file_path, delay, max_requests)
-    scraper.load_data()
-    await scraper.scrape_all()
-    scraper.save_results(output_file)
+    scraper = Scraper(file_path, delay, max_requests, pubmed_url=pubmed_url, **options)
+    urls = None
+    count = None
+    if query:
+        urls = PubMedSearch(scraper, query, mindate, maxdate, datetype, pubmed_url=pubmed_url).urls()
+    else:
+        urls = scraper.iter_urls()
+        if scraper.progress != "none":
+            count = partial(count_urls, file_path, scraper.input_format)
+    async with scraper:
+        await scraper.scrape_to_file(output_file, batch_size, output_format,
+                                     journal_file, resume, urls, compression, row_group_size, count)
     scraper.print_results()
+    if report_file:
+        scraper.save_report(report_file)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='This script scrapes data from a list of PubMed URLs provided in a CSV file and saves the scraped data into another CSV file.')
     
-    parser.add_argument('--input_file', type=str, required=True, 
-                        help='Path to the input CSV file containing URLs to be scraped.')
+    parser.add_argument('--input_file', type=str, default=None, 
+                        help='Path to the input file containing URLs to be scraped, or - for stdin. Required unless --query is given.')
+
+    parser.add_argument('--input_format', type=str, default=None, choices=['csv', 'txt', 'jsonl', 'parquet'],
+                        help='Format of the input file: csv or parquet with a url column, txt with one URL per line, or jsonl. Default is inferred from the file extension; stdin is read as txt.')
+
+    parser.add_argument('--chunksize', type=int, default=100000,
+                        help='Number of rows read at a time from Parquet input; csv, txt and jsonl are streamed line by line. Either way memory does not grow with the input size. Default is 100000.')
+
+    parser.add_argument('--query', type=str, default=None,
+                        help='PubMed search term. The matching articles are scraped instead of the URLs in --input_file.')
+
+    parser.add_argument('--mindate', type=str, default=None,
+                        help='Start of the --query date range as YYYY, YYYY/MM or YYYY/MM/DD. Default is 1800.')
+
+    parser.add_argument('--maxdate', type=str, default=None,
+                        help='End of the --query date range as YYYY, YYYY/MM or YYYY/MM/DD. Default is today.')
+
+    parser.add_argument('--datetype', type=str, default='pdat', choices=['pdat', 'edat', 'mdat'],
+                        help='Date the --query range applies to: publication (pdat), Entrez (edat) or modification (mdat). Default is pdat.')
+
+    parser.add_argument('--pubmed_url', type=str, default=PUBMED_URL,
+                        help='Base URL of the article pages built from --query results. Input URLs under it are recognized as PubMed articles, e.g. on a mirror. Default is https://pubmed.ncbi.nlm.nih.gov.')
     
-    parser.add_argument('--delay', type=int, default=1, 
-                        help='Delay between each request in seconds. This is to prevent overloading the server with requests. Default is 1 second.')
+    parser.add_argument('--delay', type=float, default=None, 
+                        help='Delay between each request in seconds, fractions allowed. Overrides --rate with 1 / delay requests per second when given.')
+
+    parser.add_argument('--rate', type=float, default=3,
+                        help="Maximum number of requests per second, fractions allowed. This is to prevent overloading the server with requests. Default is 3, NCBI's limit without an API key.")
+
+    parser.add_argument('--burst', type=int, default=1,
+                        help='Number of requests that may start back to back before --rate applies. Default is 1.')
     
     parser.add_argument('--max_requests', type=int, default=5, 
                         help='Maximum number of concurrent requests that can be made. This is to prevent overloading the server with too many requests at once. Default is 5.')
     
     parser.add_argument('--output_file', type=str, required=True, 
                         help='Path to the output CSV file where the scraped data will be saved.')
-    
-    args = parser.parse_args()
 
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    parser.add_argument('--batch_size', type=int, default=1000,
+                        help='Number of scraped records written to the output file at a time. Default is 1000.')
 
-    try:
-        loop.run_until_complete(main(args.input_file, args.delay, args.max_requests, args.output_file))
-    finally:
-        loop.close()
+    parser.add_argument('--output_format', type=str, default=None, choices=['csv', 'jsonl', 'parquet'],
+                        help='Format of the output file. Default is inferred from the file extension, falling back to csv.')
+
+    parser.add_argument('--compression', type=str, default='zstd', choices=['zstd', 'snappy', 'gzip', 'brotli', 'lz4', 'none'],
+                        help='Compression codec of Parquet output. Default is zstd.')
+
+    parser.add_argument('--row_group_size', type=int, default=None,
+                        help='Maximum number of rows per Parquet row group. Default is the value of --batch_size.')
+
+    parser.add_argument('--report_file', type=str, default=None,
+                        help='JSON file to which the run report (per-phase p50/p95/p99 timings, bytes and pages/sec) is written. Default is no file.')
+
+    parser.add_argument('--progress', type=str, default='auto', choices=['auto', 'bar', 'log', 'none'],
+                        help='Live progress with completed, failed and in-flight URLs, pages/sec and an ETA: a tqdm bar, periodic log lines or none. Default is auto, a bar on a terminal and log lines otherwise.')
+
+    parser.add_argument('--progress_interval', type=float, default=10,
+                        help='Seconds between progress log lines. Default is 10.')
+
+    parser.add_argument('--metrics_port', type=int, default=None,
+                        help='Port of a local HTTP endpoint exposing /metrics in the Prometheus text format while scraping, e.g. 9464. Default is no endpoint.')
+
+    parser.add_argument('--metrics_host', type=str, default='127.0.0.1',
+                        help='Address the metrics endpoint listens on. Default is 127.0.0.1.')
+
+    parser.add_argument('--journal_file', type=str, default=None,
+                        help='Path to the SQLite journal recording which URLs are done. Default is the output file path followed by .journal.')
+
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip URLs the journal lists as done, retry failed ones and append to the existing output file.')
+
+    parser.add_argument('--backend', type=str, default='html', choices=['html', 'efetch'],
+                        help='Fetch backend: html scrapes each article page, efetch requests PubMed XML for many PMIDs per E-utilities call. Default is html.')
+
+    parser.add_argument('--api_key', type=str, default=None,
+                        help='NCBI API key sent with E-utilities requests. NCBI allows 10 requests per second with a key.')
+
+    parser.add_argument('--eutils_url', type=str, default=None,
+                        help='Base URL of the E-utilities service. Default is https://eutils.ncbi.nlm.nih.gov/entrez/eutils.')
+
+    parser.add_argument('--efetch_batch_size', type=int, default=200,
+                        help='Number of PMIDs requested per EFetch call. Default is 200.')
+
+    parser.add_argument('--parser', type=str, default='html.parser', choices=['html.parser', 'lxml', 'selectolax'],
+                        help='HTML parser used to extract fields from article pages. lxml and selectolax are faster but must be installed. Default is html.parser.')
+
+    parser.add_argument('--parse_workers', type=int, default=None,
+                        help='Number of processes parsing article pages so parsing never blocks downloads. 0 parses on the event loop. Default is the number of CPUs.')
+
+    parser.add_argument('--cache_dir', type=str, default=None,
+                        help='Directory of the on-disk response cache, e.g. data/raw/cache. Default is no cache.')
+
+    parser.add_argument('--cache_ttl', type=float, default=None,
+                        help='Seconds a cached response stays fresh. Default is to keep responses forever.')
+
+    parser.add_argument('--cache_max_size', type=float, default=10240,
+                        help='Maximum size of the cached responses in megabytes; least recently used ones are evicted beyond it. Default is 10240.')
+
+    parser.add_argument('--cache_only', action='store_true',
+                        help='Serve every response from the cache and never touch the network. URLs missing from the cache fail.')
+
+    parser.add_argument('--refresh', action='store_true',
+                        help='Ignore cached responses and fetch every URL again, storing the fresh responses.')
+
+    parser.add_argument('--max_attempts', type=int, default=4,
+                        help='Maximum number of attempts per URL. Connection errors, timeouts, 429 and 5xx responses are retried. Default is 4.')
+
+    parser.add_argument('--backoff_base', type=float, default=1,
+                        help='Backoff before the first retry in seconds, doubled for every later one and randomised with jitter. Default is 1.')
+
+    parser.add_argument('--backoff_max', type=float, default=60,
+                        help='Upper bound on a single backoff, including one asked for by Retry-After, in seconds. Default is 60.')
+
+    parser.add_argument('--dead_letter_file', type=str, default=None,
+                        help='JSONL file to which URLs that could not be fetched are appended; it is emptied at the start of a run unless --resume is given. Default is the output file path followed by .failed.jsonl.')
+
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Adjust the number of concurrent requests while scraping: grow it while responses stay fast and halve it on 429/503 responses, errors or latency spikes. --max_requests is the starting value.')
+
+    parser.add_argument('--adaptive_min', type=int, default=1,
+                        help='Lower bound on concurrent requests with --adaptive. Default is 1.')
+
+    parser.add_argument('--adaptive_max', type=int, default=50,
+                        help='Upper bound on concurrent requests with --adaptive. Default is 50.')
+
+    parser.add_argument('--keep_duplicates', action='store_true',
+                        help='Fetch every input URL as given. By default PubMed URLs are canonicalized, and a row whose PMID is in flight or among the last --dedupe_window results is written from that result instead of being fetched again.')
+
+    parser.add_argument('--dedupe_window', type=int, default=10000,
+                        help='Number of recent results kept to answer duplicate rows that arrive after their PMID finished. Default is 10000.')
+
+    parser.add_argument('--loop', type=str, default='asyncio', choices=['asyncio', 'uvloop'],
+                        help='Event loop implementation. uvloop cuts event-loop overhead at high concurrency; the default asyncio loop is used if it is not installed. Default is asyncio.')
+
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of workers pulling URLs from the queue. Default is the value of --max_requests.')
+
+    parser.add_argument('--queue_size', type=int, default=None,
+                        help='Maximum number of URLs and results waiting in the queues. Default is twice the number of workers.')
+
+    parser.add_argument('--limit_per_host', type=int, default=None,
+                        help='Maximum number of pooled connections to a single host. Default is the value of --max_requests.')
+
+    parser.add_argument('--keepalive_timeout', type=float, default=30,
+                        help='Seconds an idle pooled connection is kept open for reuse. Default is 30 seconds.')
+
+    parser.add_argument('--dns_cache_ttl', type=int, default=300,
+                        help='Seconds a resolved host address is cached. Default is 300 seconds.')
+    
+    args = parser.parse_args()
+    if not args.input_file and not args.query:
+        parser.error('one of --input_file or --query is required')
 
+    install_event_loop(args.loop)
+    asyncio.run(main(args.input_file, args.delay, args.max_requests, args.output_file,
+                         batch_size=args.batch_size,
+                         input_format=args.input_format,
+                         chunksize=args.chunksize,
+                         query=args.query,
+                         mindate=args.mindate,
+                         maxdate=args.maxdate,
+                         datetype=args.datetype,
+                         pubmed_url=args.pubmed_url,
+                         output_format=args.output_format,
+                         compression=args.compression,
+                         row_group_size=args.row_group_size,
+                         report_file=args.report_file,
+                         progress=args.progress,
+                         progress_interval=args.progress_interval,
+                         metrics_port=args.metrics_port,
+                         metrics_host=args.metrics_host,
+                         journal_file=args.journal_file,
+                         resume=args.resume,
+                         limit_per_host=args.limit_per_host,
+                         keepalive_timeout=args.keepalive_timeout,
+                         dns_cache_ttl=args.dns_cache_ttl,
+                         rate=args.rate,
+                         burst=args.burst,
+                         backend=args.backend,
+                         api_key=args.api_key,
+                         eutils_url=args.eutils_url,
+                         efetch_batch_size=args.efetch_batch_size,
+                         parser_engine=args.parser,
+                         parse_workers=args.parse_workers,
+                         cache_dir=args.cache_dir,
+                         cache_ttl=args.cache_ttl,
+                         cache_max_size=int(args.cache_max_size * 1024 ** 2),
+                         cache_only=args.cache_only,
+                         refresh=args.refresh,
+                         retry_policy=RetryPolicy(args.max_attempts, args.backoff_base, args.backoff_max),
+                         dead_letter_file=args.dead_letter_file or f"{args.output_file}.failed.jsonl",
+                         adaptive=args.adaptive,
+                         adaptive_min=args.adaptive_min,
+                         adaptive_max=args.adaptive_max,
+                         dedupe=not args.keep_duplicates,
+                         dedupe_window=args.dedupe_window,
+                         workers=args.workers,
+                         queue_size=args.queue_size))
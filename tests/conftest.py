@@ -0,0 +1,27 @@
+import os
+import sys
+from contextlib import asynccontextmanager
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+from fixture_server import start_fixture_server  # noqa: E402
+
+
+@asynccontextmanager
+async def serve_fixtures(**kwargs):
+    """Runs the benchmark fixture server for the duration of the block and yields (runner, base_url)."""
+    runner, base_url = await start_fixture_server(**kwargs)
+    try:
+        yield runner, base_url
+    finally:
+        await runner.cleanup()
+
+
+@pytest.fixture
+def fixture_server():
+    """Returns serve_fixtures, to be entered with async with inside a test's event loop."""
+    return serve_fixtures
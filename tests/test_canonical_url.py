@@ -0,0 +1,51 @@
+import pytest
+
+from scrape_pubmed import PUBMED_URL, canonical_url, extract_pmid
+
+
+@pytest.mark.parametrize("url, pmid", [
+    ("https://pubmed.ncbi.nlm.nih.gov/123/", "123"),
+    ("https://pubmed.ncbi.nlm.nih.gov/123", "123"),
+    ("http://pubmed.ncbi.nlm.nih.gov/123/?from=search#abstract", "123"),
+    ("HTTPS://PubMed.NCBI.nlm.nih.gov/123/", "123"),
+    ("https://www.ncbi.nlm.nih.gov/pubmed/456", "456"),
+    ("https://www.ncbi.nlm.nih.gov/pubmed/456/", "456"),
+    (" 789 ", "789"),
+    ("https://www.ncbi.nlm.nih.gov/gene/672", None),
+    ("https://www.ncbi.nlm.nih.gov/pubmed/?term=456", None),
+    ("https://pubmed.ncbi.nlm.nih.gov/123/citedby/", None),
+    ("https://example.org/journal/vol/2020/5", None),
+    ("https://example.org/5/", None),
+    ("ftp://pubmed.ncbi.nlm.nih.gov/123/", None),
+])
+def test_extract_pmid(url, pmid):
+    assert extract_pmid(url) == pmid
+
+
+@pytest.mark.parametrize("url", [
+    "https://pubmed.ncbi.nlm.nih.gov/123",
+    "http://pubmed.ncbi.nlm.nih.gov/123/?from=search",
+    "https://www.ncbi.nlm.nih.gov/pubmed/123",
+    "123",
+])
+def test_pubmed_urls_are_canonicalized(url):
+    assert canonical_url(url) == f"{PUBMED_URL}/123/"
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.ncbi.nlm.nih.gov/gene/672",
+    "https://example.org/journal/vol/2020/5",
+    "https://example.org/5/",
+    "not a url",
+])
+def test_other_urls_are_unchanged(url):
+    assert canonical_url(url) == url
+
+
+def test_urls_under_pubmed_url_are_recognized():
+    mirror = "http://127.0.0.1:8765"
+    assert extract_pmid("http://127.0.0.1:8765/42?x=1", mirror) == "42"
+    assert canonical_url("http://127.0.0.1:8765/42?x=1", mirror) == "http://127.0.0.1:8765/42/"
+    assert canonical_url("42", mirror) == "http://127.0.0.1:8765/42/"
+    assert canonical_url("https://pubmed.ncbi.nlm.nih.gov/42", mirror) == f"{PUBMED_URL}/42/"
+    assert extract_pmid("http://127.0.0.1:9999/42/", mirror) is None
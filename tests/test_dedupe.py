@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+import pytest
+
+from fixture_server import request_counts
+from scrape_pubmed import PmidSet, Scraper
+
+
+def scrape(fixture_server, urls, **options):
+    """Scrapes urls (or a function of the base URL returning them) on the fixture server."""
+    async def go():
+        async with fixture_server() as (runner, base_url):
+            items = urls(base_url) if callable(urls) else urls
+            options.setdefault("pubmed_url", base_url)
+            async with Scraper(None, rate=None, parse_workers=0, **options) as scraper:
+                rows = [item async for item in scraper.scrape_iter(items)]
+            return base_url, rows, request_counts(runner), scraper
+
+    return asyncio.run(go())
+
+
+def test_duplicates_are_fetched_once_and_fanned_out(fixture_server):
+    def urls(base_url):
+        return [f"{base_url}/30000001/", f"{base_url}/30000001?from=search", "30000001",
+                f"{base_url}/30000002", f"{base_url}/30000001/"]
+
+    base_url, rows, counts, scraper = scrape(fixture_server, urls)
+    assert counts["article"] == 2
+    assert sorted(index for index, _, _ in rows) == [0, 1, 2, 3, 4]
+    for index, url, data in rows:
+        assert url == urls(base_url)[index]
+        assert data.pmid == ("30000002" if index == 3 else "30000001")
+    assert scraper.refetched == 0
+
+
+def test_keep_duplicates_fetches_every_row(fixture_server):
+    def urls(base_url):
+        return [f"{base_url}/30000001/", f"{base_url}/30000001/", f"{base_url}/30000001?from=search"]
+
+    _, rows, counts, _ = scrape(fixture_server, urls, dedupe=False)
+    assert counts["article"] == 3
+    assert all(data.pmid == "30000001" for _, _, data in rows)
+
+
+def test_duplicates_outside_the_window_are_fetched_again(fixture_server):
+    def urls(base_url):
+        async def slow():
+            yield f"{base_url}/30000001/"
+            yield f"{base_url}/30000002/"
+            await asyncio.sleep(0.3)
+            yield f"{base_url}/30000001/"
+        return slow()
+
+    _, rows, counts, scraper = scrape(fixture_server, urls, dedupe_window=1, workers=1)
+    assert len(rows) == 3
+    assert counts["article"] == 3
+    assert scraper.refetched == 1
+
+    _, rows, counts, scraper = scrape(fixture_server, urls, workers=1)
+    assert counts["article"] == 2
+    assert scraper.refetched == 0
+
+
+def test_other_urls_are_fetched_as_given(fixture_server, tmp_path):
+    dead_letter_file = tmp_path / "failed.jsonl"
+
+    def urls(base_url):
+        return [f"{base_url}/journal/2020/30000001/", f"{base_url}/30000001/"]
+
+    base_url, rows, counts, _ = scrape(fixture_server, urls, dead_letter_file=str(dead_letter_file))
+    results = {url: data for _, url, data in rows}
+    assert results[f"{base_url}/journal/2020/30000001/"] is None
+    assert results[f"{base_url}/30000001/"].pmid == "30000001"
+    entries = [json.loads(line) for line in dead_letter_file.read_text().splitlines()]
+    assert [(entry["url"], entry["reason"]) for entry in entries] == [(f"{base_url}/journal/2020/30000001/", "HTTP 404")]
+
+
+def test_numbers_above_max_pmid_are_not_pmids(fixture_server):
+    def urls(base_url):
+        return [f"{base_url}/999999999/", f"{base_url}/999999999/"]
+
+    _, rows, counts, scraper = scrape(fixture_server, urls)
+    assert counts["article"] == 2
+    assert scraper.refetched == 0
+    with pytest.raises(ValueError):
+        PmidSet().add(PmidSet.MAX_PMID + 1)
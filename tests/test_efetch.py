@@ -0,0 +1,61 @@
+import asyncio
+import json
+
+from aiohttp import web
+
+from fixture_server import load_template, request_counts
+from scrape_pubmed import Scraper
+
+
+def test_efetch_backend_batches_and_fans_out(fixture_server):
+    def urls(base_url):
+        return [f"{base_url}/{30000000 + i}/" for i in range(5)] + [f"{base_url}/30000000?x=1"]
+
+    async def go():
+        async with fixture_server() as (runner, base_url):
+            async with Scraper(None, rate=None, backend="efetch", pubmed_url=base_url,
+                               eutils_url=f"{base_url}/entrez/eutils") as scraper:
+                rows = [item async for item in scraper.scrape_iter(urls(base_url))]
+            return rows, request_counts(runner)
+
+    rows, counts = asyncio.run(go())
+    assert counts["efetch"] == 1
+    assert counts["article"] == 0
+    assert sorted(data.pmid for _, _, data in rows) == sorted(["30000000", "30000000", "30000001",
+                                                              "30000002", "30000003", "30000004"])
+
+
+def test_efetch_failures_are_written_to_the_dead_letter_file(tmp_path):
+    template = load_template("pubmed_article.xml")
+
+    async def efetch(request):
+        ids = (await request.post())["id"].split(",")
+        if "1" in ids:
+            return web.Response(text='<?xml version="1.0" ?>\n<PubmedArticleSet><PubmedArt', content_type="text/xml")
+        body = "".join(template.safe_substitute(pmid=pmid) for pmid in ids if pmid != "12")
+        return web.Response(text=f"<PubmedArticleSet>{body}</PubmedArticleSet>", content_type="text/xml")
+
+    dead_letter_file = tmp_path / "failed.jsonl"
+    urls = [f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/" for pmid in (1, 2, 11, 12)]
+
+    async def go():
+        app = web.Application()
+        app.router.add_post("/efetch.fcgi", efetch)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        try:
+            async with Scraper(None, rate=None, backend="efetch", efetch_batch_size=2, workers=1,
+                               eutils_url=f"http://127.0.0.1:{runner.addresses[0][1]}",
+                               dead_letter_file=str(dead_letter_file)) as scraper:
+                return {url: data async for _, url, data in scraper.scrape_iter(urls)}
+        finally:
+            await runner.cleanup()
+
+    results = asyncio.run(go())
+    assert [url for url, data in results.items() if data is not None] == [urls[2]]
+    entries = {entry["url"]: entry["reason"] for entry in map(json.loads, dead_letter_file.read_text().splitlines())}
+    assert set(entries) == {urls[0], urls[1], urls[3]}
+    assert entries[urls[0]].startswith("ParseError")
+    assert entries[urls[3]] == "not in the EFetch response"
@@ -0,0 +1,19 @@
+import subprocess
+import sys
+
+from bench_import import BUDGET_MS, ROOT_DIR, measure
+
+
+def test_import_is_within_budget_and_lazy():
+    total, _, eager = measure(repeat=3)
+    assert not eager, f"imported at module load: {', '.join(eager)}"
+    assert total <= BUDGET_MS, f"import took {total:.1f} ms, over the {BUDGET_MS} ms budget"
+
+
+def test_help_does_not_import_heavy_dependencies():
+    code = ("import runpy, sys; sys.argv = ['scrape_pubmed.py', '--help']\n"
+            "try:\n    runpy.run_path('scrape_pubmed.py', run_name='__main__')\n"
+            "except SystemExit:\n    pass\n"
+            "print('loaded:', ','.join(m for m in ('pandas', 'aiohttp', 'bs4', 'pyarrow') if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    assert result.stdout.splitlines()[-1] == "loaded: "
@@ -0,0 +1,75 @@
+import asyncio
+import csv
+import socket
+
+import pytest
+
+from fixture_server import fixture_urls, request_counts
+from scrape_pubmed import ProgressJournal, Scraper
+
+
+def test_remaining_skips_urls_done_before_the_journal_was_opened(tmp_path):
+    path = str(tmp_path / "run.journal")
+    with ProgressJournal(path) as journal:
+        journal.mark("a", "done")
+        journal.mark("b", "failed")
+    with ProgressJournal(path, resume=True) as journal:
+        journal.mark("c", "done")
+        journal.commit()
+
+        async def collect():
+            return [url async for url in journal.remaining(["a", "b", "c", "d", "a"], chunksize=2)]
+
+        assert asyncio.run(collect()) == ["b", "c", "d"]
+        assert journal.skipped == 2
+        assert journal.count_done() == 1
+
+
+def test_journal_is_cleared_without_resume(tmp_path):
+    path = str(tmp_path / "run.journal")
+    with ProgressJournal(path) as journal:
+        journal.mark("a", "done")
+    with ProgressJournal(path) as journal:
+        assert journal.completed(["a"]) == set()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run(fixture_server, tmp_path, count, output_file, not_found=(), port=0, **options):
+    async def go():
+        async with fixture_server(port=port, not_found=not_found) as (runner, base_url):
+            scraper = Scraper(None, rate=None, parse_workers=0, pubmed_url=base_url,
+                              dead_letter_file=str(tmp_path / "failed.jsonl"))
+            async with scraper:
+                await scraper.scrape_to_file(output_file, batch_size=2, urls=fixture_urls(base_url, count), **options)
+            return scraper, request_counts(runner)
+
+    return asyncio.run(go())
+
+
+def test_resume_retries_only_failed_urls(fixture_server, tmp_path):
+    output_file = str(tmp_path / "out.csv")
+    port = free_port()
+    scraper, counts = run(fixture_server, tmp_path, 6, output_file, not_found={"30000001", "30000004"}, port=port)
+    assert (scraper.scraped, scraper.failed, counts["article"]) == (4, 2, 6)
+
+    scraper, counts = run(fixture_server, tmp_path, 6, output_file, resume=True, port=port)
+    assert (scraper.scraped, scraper.failed, scraper.skipped, counts["article"]) == (2, 0, 4, 2)
+    with open(output_file, encoding="utf-8") as f:
+        pmids = sorted(row["pmid"] for row in csv.DictReader(f))
+    assert pmids == [str(30000000 + i) for i in range(6)]
+
+
+def test_parquet_output_cannot_be_resumed(fixture_server, tmp_path):
+    pytest.importorskip("pyarrow")
+    output_file = str(tmp_path / "out.parquet")
+    scraper, _ = run(fixture_server, tmp_path, 3, output_file)
+    assert scraper.scraped == 3
+    with ProgressJournal(f"{output_file}.journal", resume=True) as journal:
+        assert journal.count_done() == 3
+    with pytest.raises(ValueError):
+        run(fixture_server, tmp_path, 3, output_file, resume=True)
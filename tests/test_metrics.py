@@ -0,0 +1,22 @@
+import asyncio
+
+import aiohttp
+
+from scrape_pubmed import Scraper
+
+
+def test_library_scrapes_are_counted(fixture_server):
+    async def go():
+        async with fixture_server(not_found={"30000002"}) as (_, base_url):
+            async with Scraper(None, rate=None, parse_workers=0, pubmed_url=base_url, metrics_port=0) as scraper:
+                urls = [f"{base_url}/{pmid}/" for pmid in ("30000000", "30000001", "30000002", "30000000")]
+                rows = [item async for item in scraper.scrape_iter(urls)]
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(f"http://127.0.0.1:{scraper.metrics.port}/metrics") as response:
+                        text = await response.text()
+            return rows, text
+
+    rows, text = asyncio.run(go())
+    assert len(rows) == 4
+    assert "pubmed_scraper_scraped_total 3\n" in text
+    assert "pubmed_scraper_failed_total 1\n" in text
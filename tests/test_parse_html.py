@@ -0,0 +1,34 @@
+import importlib.util
+
+import pytest
+
+from fixture_server import corpus_names, load_corpus
+from scrape_pubmed import ELEMENTS, PARSER_ENGINES, Article, parse_html
+
+ENGINE_MODULES = {"html.parser": "bs4", "lxml": "lxml", "selectolax": "selectolax"}
+
+PAGES = dict(zip(corpus_names(), load_corpus()))
+
+
+@pytest.mark.parametrize("engine", PARSER_ENGINES)
+@pytest.mark.parametrize("name", sorted(PAGES))
+def test_engines_extract_identical_fields(engine, name):
+    if importlib.util.find_spec(ENGINE_MODULES[engine]) is None:
+        pytest.skip(f"{ENGINE_MODULES[engine]} is not installed")
+    expected = parse_html(PAGES[name], "html.parser")
+    got = parse_html(PAGES[name], engine)
+    assert isinstance(got, Article)
+    assert {field: got[field] for field in ELEMENTS} == {field: expected[field] for field in ELEMENTS}
+
+
+@pytest.mark.parametrize("name", sorted(PAGES))
+def test_fixture_pages_have_core_fields(name):
+    article = parse_html(PAGES[name])
+    assert article.pmid and article.pmid.isdigit()
+    assert article.title
+    assert article.journal
+
+
+def test_missing_fields_are_none():
+    article = parse_html("<html><body><p>Not an article</p></body></html>")
+    assert all(article[field] is None for field in ELEMENTS)
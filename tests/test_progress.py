@@ -0,0 +1,30 @@
+import asyncio
+
+from scrape_pubmed import Progress, PubMedSearch, Scraper
+
+
+def test_total_set_during_the_run_is_shown(capsys):
+    scraper = Scraper(None)
+    progress = Progress(scraper, mode="log", skip=2)
+    progress.show()
+    scraper.total = 12
+    scraper.scraped = 4
+    progress.show()
+    first, second = capsys.readouterr().out.splitlines()
+    assert first.startswith("Progress: 0 URLs done")
+    assert second.startswith("Progress: 4/10 URLs done")
+
+
+def test_query_sets_the_total(fixture_server, tmp_path, capsys):
+    async def go():
+        async with fixture_server(search_size=30, latency=0.02) as (_, base_url):
+            async with Scraper(None, rate=None, parse_workers=0, max_requests=2, progress="log",
+                               progress_interval=0.1, eutils_url=f"{base_url}/entrez/eutils") as scraper:
+                urls = PubMedSearch(scraper, "scraping", "2000", "2010", pubmed_url=base_url).urls()
+                await scraper.scrape_to_file(str(tmp_path / "out.csv"), urls=urls)
+                return scraper
+
+    scraper = asyncio.run(go())
+    assert scraper.total == scraper.scraped == 30
+    lines = [line for line in capsys.readouterr().out.splitlines() if line.startswith("Progress:")]
+    assert len(lines) > 1 and all("/30 URLs done" in line for line in lines)
@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+import pytest
+
+from scrape_pubmed import _aiter, read_urls
+
+
+def slow_urls(count, delay):
+    for index in range(count):
+        time.sleep(delay)
+        yield f"https://example.org/{index}/"
+
+
+def test_blocking_reads_do_not_stall_the_loop():
+    async def go():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        urls = [url async for url in _aiter(slow_urls(5, 0.1))]
+        ticker.cancel()
+        return urls, ticks
+
+    urls, ticks = asyncio.run(go())
+    assert urls == [f"https://example.org/{index}/" for index in range(5)]
+    assert ticks >= 20
+
+
+def test_errors_and_early_exit(tmp_path):
+    def failing():
+        yield "https://example.org/1/"
+        raise ValueError("bad row")
+
+    async def consume(urls, limit=None, seen=None):
+        seen = [] if seen is None else seen
+        async for url in _aiter(urls):
+            seen.append(url)
+            if len(seen) == limit:
+                break
+        return seen
+
+    seen = []
+    with pytest.raises(ValueError, match="bad row"):
+        asyncio.run(consume(failing(), seen=seen))
+    assert seen == ["https://example.org/1/"]
+
+    input_file = tmp_path / "urls.txt"
+    input_file.write_text("".join(f"https://example.org/{index}/\n" for index in range(50000)))
+    urls = read_urls(str(input_file))
+    assert len(asyncio.run(consume(urls, limit=10))) == 10
+
+
+@pytest.mark.parametrize("name, content", [
+    ("bom.csv", "url,title\nhttps://example.org/1/,One\nhttps://example.org/2/,Two\n"),
+    ("bom.txt", "https://example.org/1/\nhttps://example.org/2/\n"),
+    ("bom.jsonl", '{"url": "https://example.org/1/"}\n"https://example.org/2/"\n'),
+])
+def test_byte_order_mark_is_skipped(tmp_path, name, content):
+    input_file = tmp_path / name
+    input_file.write_text(content, encoding="utf-8-sig")
+    assert list(read_urls(str(input_file))) == ["https://example.org/1/", "https://example.org/2/"]
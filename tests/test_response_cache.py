@@ -0,0 +1,107 @@
+import os
+import time
+
+import pytest
+
+from scrape_pubmed import ResponseCache
+
+
+def indexed_size(cache):
+    return cache.connection.execute(
+        "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM responses)").fetchone()[0]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache"))
+    yield cache
+    cache.close()
+
+
+def test_round_trip_with_normalized_url(cache):
+    cache.put("HTTPS://Example.org:443/a?b=2&a=1#top", b"body")
+    assert cache.get("https://example.org/a?a=1&b=2") == b"body"
+    assert cache.get("https://example.org/a") is None
+
+
+def test_form_data_is_part_of_the_key(cache):
+    cache.put("https://example.org/efetch", b"one", {"id": "1"})
+    cache.put("https://example.org/efetch", b"two", {"id": "2"})
+    assert cache.get("https://example.org/efetch", {"id": "1"}) == b"one"
+    assert cache.get("https://example.org/efetch", {"id": "2"}) == b"two"
+
+
+def test_stale_entries_are_ignored(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=60)
+    cache.put("https://example.org/1/", b"old")
+    cache.connection.execute("UPDATE responses SET stored = ?", (time.time() - 120,))
+    assert cache.get("https://example.org/1/") is None
+    cache.close()
+
+
+def test_identical_bodies_are_stored_once(cache):
+    cache.put("https://example.org/1/", b"same body")
+    cache.put("https://example.org/2/", b"same body")
+    assert cache.size == indexed_size(cache)
+    assert cache.connection.execute("SELECT COUNT(DISTINCT digest) FROM responses").fetchone()[0] == 1
+
+
+def test_replaced_body_is_removed(cache):
+    cache.put("https://example.org/1/", b"first")
+    (digest,) = cache.connection.execute("SELECT digest FROM responses").fetchone()
+    cache.put("https://example.org/1/", b"second")
+    assert not os.path.exists(cache.body_path(digest))
+    assert cache.size == indexed_size(cache)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    bodies = {f"https://example.org/{i}/": os.urandom(1000) for i in range(10)}
+    cache = ResponseCache(str(tmp_path), max_size=10 ** 6)
+    for url, body in bodies.items():
+        cache.put(url, body)
+        time.sleep(0.001)
+    entry_size = cache.size // 10
+    assert cache.get("https://example.org/0/") == bodies["https://example.org/0/"]
+    cache.max_size = 5 * entry_size
+    cache.put("https://example.org/new/", os.urandom(1000))
+
+    assert cache.size <= cache.max_size
+    assert cache.size == indexed_size(cache)
+    assert cache.get("https://example.org/0/") is not None
+    assert cache.get("https://example.org/new/") is not None
+    assert cache.get("https://example.org/1/") is None
+    kept = cache.connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+    assert len(list(tmp_path.glob("*/*.z"))) == kept
+    cache.close()
+
+
+def test_size_is_restored_when_reopened(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    for i in range(5):
+        cache.put(f"https://example.org/{i}/", os.urandom(100 + i))
+    size = cache.size
+    cache.close()
+    cache = ResponseCache(str(tmp_path))
+    assert cache.size == size
+    cache.close()
+
+
+def test_access_times_are_saved_on_close(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put("https://example.org/1/", b"body")
+    (stored,) = cache.connection.execute("SELECT accessed FROM responses").fetchone()
+    time.sleep(0.01)
+    cache.get("https://example.org/1/")
+    cache.close()
+    cache = ResponseCache(str(tmp_path))
+    (accessed,) = cache.connection.execute("SELECT accessed FROM responses").fetchone()
+    assert accessed > stored
+    cache.close()
+
+
+def test_api_key_is_not_part_of_the_key(cache):
+    cache.put("https://example.org/efetch?api_key=secret", b"body", {"id": "1", "api_key": "secret"})
+    assert cache.get("https://example.org/efetch", {"id": "1"}) == b"body"
+    assert cache.get("https://example.org/efetch?api_key=other", {"id": "1", "api_key": "other"}) == b"body"
+    keys = [key for (key,) in cache.connection.execute("SELECT key FROM responses")]
+    assert not any("secret" in key for key in keys)
@@ -0,0 +1,25 @@
+import pytest
+
+from scrape_pubmed import ResultWriter, parquet_schema
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def test_parquet_is_typed(tmp_path):
+    output_file = str(tmp_path / "out.parquet")
+    with ResultWriter(output_file, batch_size=1) as writer:
+        writer.write({"url": "https://example.org/1/", "pmid": "1", "authors": "Doe J, Roe R", "journal": "J"})
+        writer.write({"url": "https://example.org/2/", "pmid": "2"})
+    table = pq.read_table(output_file)
+    assert table.schema.equals(parquet_schema())
+    assert table.column("pmid").to_pylist() == [1, 2]
+    assert table.column("authors").to_pylist()[1] is None
+
+
+def test_parquet_without_rows_is_still_readable(tmp_path):
+    output_file = str(tmp_path / "out.parquet")
+    with ResultWriter(output_file):
+        pass
+    table = pq.read_table(output_file)
+    assert table.num_rows == 0
+    assert table.schema.equals(parquet_schema())
@@ -0,0 +1,143 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from scrape_pubmed import FetchError, RetryPolicy, Scraper
+
+
+@pytest.mark.parametrize("status, transient", [(408, True), (429, True), (500, True), (503, True),
+                                               (400, False), (403, False), (404, False)])
+def test_transient_statuses(status, transient):
+    assert RetryPolicy().is_transient(status=status) is transient
+
+
+@pytest.mark.parametrize("exc, transient", [(asyncio.TimeoutError(), True),
+                                            (aiohttp.ServerDisconnectedError(), True),
+                                            (aiohttp.ClientPayloadError(), True),
+                                            (aiohttp.InvalidURL("x"), False)])
+def test_transient_exceptions(exc, transient):
+    assert RetryPolicy().is_transient(exc=exc) is transient
+
+
+def test_backoff_doubles_up_to_max_delay():
+    policy = RetryPolicy(base_delay=1, max_delay=5)
+    for attempt, ceiling in ((1, 1), (2, 2), (3, 4), (4, 5), (10, 5)):
+        delays = [policy.backoff(attempt) for _ in range(200)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+
+
+def test_backoff_waits_for_retry_after():
+    policy = RetryPolicy(base_delay=0.01, max_delay=60)
+    assert policy.backoff(1, "7") >= 7
+    assert policy.backoff(1, "600") == 60
+
+
+def test_parse_retry_after():
+    policy = RetryPolicy(max_delay=60)
+    assert policy.parse_retry_after(None) == 0
+    assert policy.parse_retry_after("2.5") == 2.5
+    assert policy.parse_retry_after("-3") == 0
+    assert policy.parse_retry_after("soon") == 0
+    later = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 <= policy.parse_retry_after(later) <= 30
+
+
+async def serve(handler):
+    app = web.Application()
+    app.router.add_get("/{pmid}/", handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+
+def test_fetch_content_retries_transient_failures():
+    calls = []
+
+    async def flaky(request):
+        calls.append(request.path)
+        if len(calls) < 3:
+            raise web.HTTPServiceUnavailable(headers={"Retry-After": "0"})
+        return web.Response(text="ok")
+
+    async def go():
+        runner, base_url = await serve(flaky)
+        try:
+            async with Scraper(None, rate=None, parse_workers=0,
+                               retry_policy=RetryPolicy(max_attempts=4, base_delay=0.01)) as scraper:
+                content = await scraper.fetch_content(f"{base_url}/1/")
+            return content, scraper.retries
+        finally:
+            await runner.cleanup()
+
+    content, retries = asyncio.run(go())
+    assert content == b"ok"
+    assert retries == 2
+    assert len(calls) == 3
+
+
+def test_fetch_content_does_not_retry_permanent_failures():
+    calls = []
+
+    async def missing(request):
+        calls.append(request.path)
+        raise web.HTTPNotFound()
+
+    async def go():
+        runner, base_url = await serve(missing)
+        try:
+            async with Scraper(None, rate=None, parse_workers=0,
+                               retry_policy=RetryPolicy(max_attempts=4, base_delay=0.01)) as scraper:
+                await scraper.fetch_content(f"{base_url}/1/")
+        finally:
+            await runner.cleanup()
+
+    with pytest.raises(FetchError) as error:
+        asyncio.run(go())
+    assert error.value.reason == "HTTP 404"
+    assert error.value.attempts == 1
+    assert len(calls) == 1
+
+
+def test_fetch_content_gives_up_after_max_attempts():
+    async def unavailable(request):
+        raise web.HTTPServiceUnavailable()
+
+    async def go():
+        runner, base_url = await serve(unavailable)
+        try:
+            async with Scraper(None, rate=None, parse_workers=0,
+                               retry_policy=RetryPolicy(max_attempts=3, base_delay=0.01)) as scraper:
+                await scraper.fetch_content(f"{base_url}/1/")
+        finally:
+            await runner.cleanup()
+
+    with pytest.raises(FetchError) as error:
+        asyncio.run(go())
+    assert error.value.attempts == 3
+
+
+def test_dead_letter_file_starts_empty_unless_resuming(fixture_server, tmp_path):
+    dead_letter_file = tmp_path / "failed.jsonl"
+
+    async def run(pmids, resume=False):
+        async with fixture_server(not_found={"30000001", "30000002"}) as (_, base_url):
+            async with Scraper(None, rate=None, parse_workers=0, pubmed_url=base_url,
+                               dead_letter_file=str(dead_letter_file)) as scraper:
+                urls = [f"{base_url}/{pmid}/" for pmid in pmids]
+                await scraper.scrape_to_file(str(tmp_path / "out.csv"), urls=urls, resume=resume)
+
+    def failed():
+        return [json.loads(line)["url"].rsplit("/", 2)[1] for line in dead_letter_file.read_text().splitlines()]
+
+    asyncio.run(run(["30000000", "30000001"]))
+    asyncio.run(run(["30000002"]))
+    assert failed() == ["30000002"]
+    asyncio.run(run(["30000001"], resume=True))
+    assert failed() == ["30000002", "30000001"]
@@ -0,0 +1,37 @@
+import asyncio
+
+from fixture_server import request_counts
+from scrape_pubmed import PubMedSearch, Scraper
+
+
+def search(fixture_server, search_size, search_days, **options):
+    async def go():
+        async with fixture_server(search_size=search_size, search_days=search_days) as (runner, base_url):
+            async with Scraper(None, rate=None, eutils_url=f"{base_url}/entrez/eutils") as scraper:
+                search = PubMedSearch(scraper, "scraping", "2000", "2030", pubmed_url=base_url, **options)
+                pmids = [pmid async for pmid in search.pmids()]
+            return pmids, scraper.total, request_counts(runner)
+
+    return asyncio.run(go())
+
+
+def test_date_range_is_split_past_the_limit(fixture_server):
+    pmids, total, counts = search(fixture_server, 25000, 3650)
+    assert total == 25000
+    assert len(pmids) == 25000
+    assert set(pmids) == {str(30000000 + i) for i in range(25000)}
+    assert counts["esearch"] > 3
+
+
+def test_small_result_is_fetched_in_pages(fixture_server):
+    pmids, total, counts = search(fixture_server, 120, 30, page_size=50)
+    assert pmids == [str(30000000 + i) for i in range(120)]
+    assert total == 120
+    assert (counts["esearch"], counts["efetch"]) == (1, 3)
+
+
+def test_single_day_past_the_limit_is_truncated(fixture_server, capsys):
+    pmids, total, _ = search(fixture_server, 10500, 1)
+    assert total == 10500
+    assert len(pmids) == PubMedSearch.LIMIT
+    assert "only the first 9999 can be retrieved" in capsys.readouterr().out
@@ -0,0 +1,15 @@
+import asyncio
+
+from scrape_pubmed import Scraper
+
+
+def test_scrape_iter_without_async_with(fixture_server):
+    async def go():
+        async with fixture_server() as (_, base_url):
+            scraper = Scraper(None, rate=None, parse_workers=0, pubmed_url=base_url)
+            rows = [item async for item in scraper.scrape_iter([f"{base_url}/30000001/"])]
+            return rows, scraper.session
+
+    rows, session = asyncio.run(go())
+    assert rows[0][2].pmid == "30000001"
+    assert session is None